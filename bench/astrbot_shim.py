@@ -0,0 +1,93 @@
+"""在没有安装 AstrBot 的环境中运行基准测试时使用的最小替身
+
+只提供 main.py 导入的名字；已安装 AstrBot 时不会生效。
+"""
+import enum
+import logging
+import sys
+import types
+
+
+def _identity_decorator(*args, **kwargs):
+    return lambda func: func
+
+
+class _Filter:
+    """filter.command / filter.command_group 等装饰器都原样返回被装饰的函数"""
+
+    def command_group(self, *args, **kwargs):
+        def decorator(func):
+            func.command = _identity_decorator
+            return func
+        return decorator
+
+    def __getattr__(self, name):
+        return _identity_decorator
+
+
+class AstrBotConfig(dict):
+    def save_config(self):
+        pass
+
+
+class MessageChain:
+    def __init__(self):
+        self.chain = []
+
+    def message(self, text: str):
+        self.chain.append(text)
+        return self
+
+
+class MessageType(enum.Enum):
+    GROUP_MESSAGE = "GroupMessage"
+    FRIEND_MESSAGE = "FriendMessage"
+    OTHER_MESSAGE = "OtherMessage"
+
+
+class Star:
+    def __init__(self, context, *args, **kwargs):
+        self.context = context
+
+
+def register(*args, **kwargs):
+    return lambda cls: cls
+
+
+class _Placeholder:
+    pass
+
+
+def install():
+    """AstrBot 不可用时把替身模块放进 sys.modules"""
+    try:
+        import astrbot.api  # noqa: F401
+        return False
+    except ImportError:
+        pass
+
+    modules = {
+        "astrbot": {},
+        "astrbot.api": {"logger": logging.getLogger("astrbot"), "AstrBotConfig": AstrBotConfig},
+        "astrbot.api.event": {
+            "filter": _Filter(),
+            "AstrMessageEvent": _Placeholder,
+            "MessageEventResult": _Placeholder,
+        },
+        "astrbot.api.star": {"Context": _Placeholder, "Star": Star, "register": register},
+        "astrbot.api.message_components": {"File": _Placeholder},
+        "astrbot.core": {},
+        "astrbot.core.message": {},
+        "astrbot.core.message.message_event_result": {"MessageChain": MessageChain},
+        "astrbot.core.platform": {},
+        "astrbot.core.platform.message_type": {"MessageType": MessageType},
+        "astrbot.core.platform.sources": {},
+        "astrbot.core.platform.sources.wechatpadpro": {},
+        "astrbot.core.platform.sources.wechatpadpro.wechatpadpro_adapter": {"WeChatPadProAdapter": _Placeholder},
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+    return True
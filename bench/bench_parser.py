@@ -0,0 +1,59 @@
+"""测量创建任务命令的解析吞吐量
+
+按每种时间写法分别统计单条解析的耗时，再测量 /time import 使用的批量解析。
+用法: python bench/bench_parser.py [每种写法的解析次数]
+"""
+import importlib
+import os
+import sys
+import time
+from datetime import datetime
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+# 解析器只依赖 APScheduler，不需要 AstrBot 运行环境
+command_parser = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.command_parser")
+
+COMMANDS = {
+    "每天": "每天 08:00 早上好！",
+    "工作日+GPT": "工作日 09:00 GPT 说一句励志的话",
+    "每周X+多群": "每周五 17:30 周末愉快！ group[工作群,亲友群,天气群]",
+    "每月N号": "每月15号 10:00 catchup[all] 该交房租了",
+    "每N分钟": "每30分钟 起来活动一下",
+    "时间范围": "工作日 09:00-18:00 每30分钟 喝水",
+    "N小时后": "2小时后 开会",
+    "具体日期": "2099-03-30 16:30 提醒",
+    "明天": "明天 10:00 提醒",
+    "cron": "cron[*/30 9-18 * * 1-5] 起来活动一下吧！",
+    "格式错误": "每天 25:00 早上好",
+}
+
+
+def bench_single(text: str, n: int, now: datetime) -> float:
+    parse = command_parser.parse_command
+    started = time.perf_counter()
+    for _ in range(n):
+        try:
+            parse(text, now)
+        except command_parser.ParseError:
+            pass
+    return (time.perf_counter() - started) / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    now = datetime.now()
+    print("写法\t每条(µs)\t每秒条数")
+    for name, text in COMMANDS.items():
+        per_call = bench_single(text, n, now)
+        print(f"{name}\t{per_call * 1e6:.1f}\t{1 / per_call:,.0f}")
+
+    lines = list(COMMANDS.values()) * (n // len(COMMANDS))
+    started = time.perf_counter()
+    command_parser.parse_commands(lines, now)
+    elapsed = time.perf_counter() - started
+    print(f"批量解析 {len(lines)} 行: {elapsed:.3f}s，每秒 {len(lines) / elapsed:,.0f} 行")
+
+
+if __name__ == "__main__":
+    main()
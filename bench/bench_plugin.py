@@ -0,0 +1,237 @@
+"""插件整体性能基准测试
+
+用替身 Context / LLM Provider / WeChatPadPro 平台驱动 MyPlugin，依次测量：
+- 启动：构造插件（AstrBot 启动时等待的部分）的耗时，后台加载完 N 个已保存任务的就绪时间，
+  以及加载期间事件循环最长一次没有响应的时间
+- 批量创建：连续执行 /time 命令的吞吐量
+- /time ls all：列出一页任务的耗时
+- /time rm：删除任务的吞吐量
+- 集中触发：大量任务在同一时刻触发时的发送延迟 p50/p99
+以及进程峰值内存(RSS)。每个任务规模在独立子进程中运行，互不影响峰值内存。
+
+用法:
+    python bench/bench_plugin.py                      # 默认 1000 10000 100000
+    python bench/bench_plugin.py --sizes 1000 --fire 2000 --llm-latency 0.2
+    python bench/bench_plugin.py --json               # 输出 JSON，便于对比
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+
+CRON_EXPRS = [f"{m} {h} * * *" for h in (8, 9, 12, 18, 21) for m in (0, 15, 30, 45)] + \
+             [f"0 {h} * * 0-4" for h in range(7, 12)] + ["*/30 9-18 * * 0-4", "0 * * * *"]
+
+
+def load_plugin_module():
+    """以包的形式导入插件的 main 模块（插件内部使用相对导入）"""
+    sys.path.insert(0, BENCH_DIR)
+    import astrbot_shim
+    astrbot_shim.install()
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    return importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.main")
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def write_tasks(n: int, gpt_ratio: float):
+    """生成 n 个已保存的任务：约 70% 循环任务，30% 未来的一次性任务，分布在 500 个会话中"""
+    rng = random.Random(n)
+    now = time.time()
+    tasks = {}
+    for i in range(n):
+        origin = f"wechatpadpro:GroupMessage:{i % 500}@chatroom"
+        task = {
+            "id": str(i).zfill(6),
+            "content": f"提醒内容 {i}",
+            "use_gpt": rng.random() < gpt_ratio,
+            "group_name": f"群{i % 500}",
+            "created_at": "2025-01-01 00:00:00",
+        }
+        if rng.random() < 0.7:
+            task["cron"] = rng.choice(CRON_EXPRS)
+        else:
+            run_at = now + rng.randint(2, 365) * 86400
+            task["datetime"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(run_at))
+        tasks.setdefault(origin, []).append(task)
+    os.makedirs("data/timetask", exist_ok=True)
+    with open("data/timetask/tasks.json", "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False)
+
+
+async def max_loop_stall(until: asyncio.Task) -> float:
+    """等待 until 完成，返回期间事件循环最长一次没有响应的秒数"""
+    worst = 0.0
+    while not until.done():
+        before = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - before - 0.001)
+    return worst
+
+
+async def run_command(handler, event) -> list:
+    return [result async for result in handler(event)]
+
+
+async def bench_single(args) -> dict:
+    main = load_plugin_module()
+    from fakes import FakeContext, FakeEvent, FakeProvider, FakeWeChatPadPro
+
+    n = args.single
+    result = {"tasks": n}
+    workdir = tempfile.mkdtemp(prefix="timetask-bench-")
+    os.chdir(workdir)
+    write_tasks(n, args.gpt_ratio)
+
+    provider = FakeProvider(args.llm_latency)
+    context = FakeContext(provider, FakeWeChatPadPro(args.contacts, args.contact_latency))
+    config = {
+        # 基准测试只关心插件自身的开销，放开发送限速
+        "send_rate": 1e9,
+        "send_burst": 10 ** 9,
+        "send_queue_size": 10 ** 9,
+        "llm_max_concurrency": args.llm_concurrency,
+    }
+
+    # 启动
+    started = time.perf_counter()
+    plugin = main.MyPlugin(context, config)
+    result["startup_s"] = time.perf_counter() - started
+    result["load_stall_ms"] = await max_loop_stall(plugin._loading) * 1000
+    result["ready_s"] = time.perf_counter() - started
+    result["rss_after_startup_mb"] = peak_rss_mb()
+
+    # 批量创建，其中 10% 发到群，走联系人缓存
+    creates = args.creates
+    started = time.perf_counter()
+    for i in range(creates):
+        hour, minute = divmod(i % 1440, 60)
+        command = f"time 每天 {hour:02d}:{minute:02d} 批量提醒 {i}"
+        if i % 10 == 0:
+            command += f" group[群{i % args.contacts}]"
+        await run_command(plugin.time_main, FakeEvent(command))
+    elapsed = time.perf_counter() - started
+    result["create_per_s"] = creates / elapsed
+
+    # 列出任务
+    started = time.perf_counter()
+    output = await run_command(plugin.list_tasks, FakeEvent("time ls all"))
+    result["ls_s"] = time.perf_counter() - started
+    result["ls_chars"] = sum(len(text) for text in output)
+
+    # 删除任务，每条命令删除 10 个
+    ids = list(plugin.task_index)[:args.removes]
+    started = time.perf_counter()
+    for i in range(0, len(ids), 10):
+        await run_command(plugin.remove_task, FakeEvent("time rm " + " ".join(ids[i:i + 10])))
+    elapsed = time.perf_counter() - started
+    result["rm_per_s"] = len(ids) / elapsed if ids else float("nan")
+
+    # 集中触发：fire 个一次性任务在同一秒触发
+    boundary = math.ceil(time.time()) + args.fire_delay
+    sent_before = len(context.sent)
+    for i in range(args.fire):
+        task = main.Task(
+            id=plugin.id_allocator.allocate(),
+            msg_origin=f"wechatpadpro:GroupMessage:{i % 500}@chatroom",
+            content=f"集中触发 {i}",
+            use_gpt=i < args.fire * args.gpt_ratio,
+            run_at=boundary,
+        )
+        plugin._index_task(task)
+        plugin._schedule_task(task)
+    deadline = boundary + args.fire_timeout
+    while len(context.sent) - sent_before < args.fire and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    lateness = [sent_at - boundary for _, _, sent_at in context.sent[sent_before:]]
+    result["fired"] = len(lateness)
+    result["fire_p50_ms"] = percentile(lateness, 50) * 1000
+    result["fire_p99_ms"] = percentile(lateness, 99) * 1000
+    result["llm_calls"] = provider.calls
+
+    started = time.perf_counter()
+    await plugin.terminate()
+    result["terminate_s"] = time.perf_counter() - started
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def format_table(results: list) -> str:
+    columns = [
+        ("tasks", "任务数", "{:d}"),
+        ("startup_s", "启动(s)", "{:.3f}"),
+        ("ready_s", "就绪(s)", "{:.3f}"),
+        ("load_stall_ms", "加载阻塞(ms)", "{:.0f}"),
+        ("create_per_s", "创建(/s)", "{:.0f}"),
+        ("ls_s", "ls(s)", "{:.3f}"),
+        ("rm_per_s", "删除(/s)", "{:.0f}"),
+        ("fired", "触发数", "{:d}"),
+        ("fire_p50_ms", "延迟p50(ms)", "{:.0f}"),
+        ("fire_p99_ms", "延迟p99(ms)", "{:.0f}"),
+        ("llm_calls", "LLM调用", "{:d}"),
+        ("peak_rss_mb", "峰值RSS(MB)", "{:.0f}"),
+    ]
+    lines = ["\t".join(title for _, title, _ in columns)]
+    for result in results:
+        lines.append("\t".join(fmt.format(result[key]) for key, _, fmt in columns))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="timetask 插件基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="已保存的任务数量")
+    parser.add_argument("--creates", type=int, default=1000, help="批量创建的任务数")
+    parser.add_argument("--removes", type=int, default=1000, help="删除的任务数")
+    parser.add_argument("--fire", type=int, default=5000, help="同一时刻触发的任务数")
+    parser.add_argument("--fire-delay", type=int, default=3, help="距离集中触发时刻的秒数")
+    parser.add_argument("--fire-timeout", type=float, default=120, help="等待集中触发完成的最长秒数")
+    parser.add_argument("--gpt-ratio", type=float, default=0.1, help="使用GPT的任务比例")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="LLM 每次调用的延迟(秒)")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="LLM 最大并发数")
+    parser.add_argument("--contacts", type=int, default=2000, help="联系人(群)数量")
+    parser.add_argument("--contact-latency", type=float, default=0.2, help="联系人接口延迟(秒)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        # 子进程：只运行一个规模，最后一行输出 JSON 结果
+        print(json.dumps(asyncio.run(bench_single(args))))
+        return
+
+    results = []
+    passthrough = [arg for arg in sys.argv[1:] if arg != "--json"]
+    for size in args.sizes:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *passthrough, "--single", str(size)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(json.dumps(results, indent=2) if args.json else format_table(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""间隔任务引擎的基准测试
+
+注册 N 个间隔任务，模拟时钟逐秒推进，测量每次 tick 的耗时和每个到期任务的分摊耗时，
+并与每个任务一个 APScheduler IntervalTrigger job 的做法对比同样的到期数量。
+每次 tick 的开销应该只随到期的任务数增长，与注册的任务总数无关。
+
+用法: python bench/bench_tick.py [--sizes 1000 10000 100000] [--ticks 300]
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+
+# 间隔秒数的分布：心跳类的短间隔为主
+INTERVALS = (30, 60, 120, 300, 600)
+
+
+def load_tick_module():
+    sys.path.insert(0, BENCH_DIR)
+    import astrbot_shim
+    astrbot_shim.install()
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    return importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.tick")
+
+
+async def noop(*args):
+    pass
+
+
+async def bench_engine(tick_module, n: int, ticks: int) -> dict:
+    engine = tick_module.TickEngine(noop)
+    base = int(time.time()) + 3600
+    # 起始时间在 base 之前错开，到期的任务均匀分布在每一秒
+    engine.add_many([(str(i), INTERVALS[i % len(INTERVALS)], base - i % 600) for i in range(n)])
+    engine._worker.cancel()
+    started = time.perf_counter()
+    for second in range(1, ticks + 1):
+        engine._tick(base + second)
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*engine._batches)
+    return {"elapsed": elapsed, "dispatched": engine.dispatched}
+
+
+async def bench_apscheduler(n: int, ticks: int) -> dict:
+    """每个任务一个 job，模拟时钟下调度器处理到期 job 的耗时"""
+    scheduler = AsyncIOScheduler()
+    base = datetime.now(scheduler.timezone) + timedelta(hours=1)
+    for i in range(n):
+        interval = INTERVALS[i % len(INTERVALS)]
+        scheduler.add_job(
+            noop,
+            trigger=IntervalTrigger(seconds=interval, start_date=base - timedelta(seconds=i % 600)),
+            id=str(i),
+            misfire_grace_time=None,
+        )
+    scheduler.start(paused=True)
+    jobstore = scheduler._lookup_jobstore("default")
+    dispatched = 0
+    started = time.perf_counter()
+    for second in range(1, ticks + 1):
+        now = base + timedelta(seconds=second)
+        # 与 BaseScheduler._process_jobs 相同：取出到期 job，计算下次触发并写回 jobstore
+        for job in jobstore.get_due_jobs(now):
+            run_times = job._get_run_times(now)
+            asyncio.ensure_future(job.func())
+            dispatched += len(run_times[-1:])
+            next_run = job.trigger.get_next_fire_time(run_times[-1], now)
+            if next_run:
+                job._modify(next_run_time=next_run)
+                jobstore.update_job(job)
+            else:
+                jobstore.remove_job(job.id)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    scheduler.shutdown(wait=False)
+    return {"elapsed": elapsed, "dispatched": dispatched}
+
+
+async def run(sizes: list[int], ticks: int):
+    tick_module = load_tick_module()
+    print("任务数\t方式\t每次tick(µs)\t每个到期任务(µs)")
+    for n in sizes:
+        for name, result in (
+            ("tick引擎", await bench_engine(tick_module, n, ticks)),
+            ("APScheduler", await bench_apscheduler(n, ticks)),
+        ):
+            per_tick = result["elapsed"] / ticks * 1e6
+            per_task = result["elapsed"] / max(result["dispatched"], 1) * 1e6
+            print(f"{n}\t{name}\t{per_tick:.1f}\t{per_task:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="注册的间隔任务数")
+    parser.add_argument("--ticks", type=int, default=300, help="模拟推进的秒数")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.ticks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""基准测试使用的 Context、LLM Provider、WeChatPadPro 平台和消息事件替身"""
+import asyncio
+import time
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.completion_text = text
+        self.raw_completion = None
+
+
+class FakeProvider:
+    """text_chat 固定延迟 latency 秒后返回"""
+
+    def __init__(self, latency: float = 0.5):
+        self.latency = latency
+        self.calls = 0
+
+    async def text_chat(self, prompt: str, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return FakeResponse(f"[GPT] {prompt}")
+
+
+class FakeWeChatPadPro:
+    """联系人接口：contacts 个群，名为 群0 ~ 群N，每次调用延迟 latency 秒"""
+
+    def __init__(self, contacts: int = 2000, latency: float = 0.2):
+        self.contacts = contacts
+        self.latency = latency
+        self.list_calls = 0
+
+    async def get_contact_list(self):
+        self.list_calls += 1
+        await asyncio.sleep(self.latency)
+        return [f"{i}@chatroom" for i in range(self.contacts)]
+
+    async def get_contact_details_list(self, _, contact_ids):
+        await asyncio.sleep(self.latency)
+        return [
+            {"nickName": {"str": f"群{contact_id.split('@')[0]}"}, "userName": {"str": contact_id}}
+            for contact_id in contact_ids
+        ]
+
+
+class FakeContext:
+    """记录每条消息的发送时间"""
+
+    def __init__(self, provider: FakeProvider, platform: FakeWeChatPadPro):
+        self.provider = provider
+        self.platform = platform
+        # (msg_origin, 消息链, 发送时间戳)
+        self.sent = []
+
+    def get_all_providers(self):
+        return [self.provider]
+
+    def get_using_provider(self, *args, **kwargs):
+        return self.provider
+
+    def get_platform(self, name):
+        return self.platform
+
+    async def send_message(self, msg_origin, message_chain):
+        self.sent.append((msg_origin, message_chain, time.time()))
+        return True
+
+
+class FakeEvent:
+    def __init__(self, message: str, origin: str = "wechatpadpro:FriendMessage:wxid_bench",
+                 platform: str = "wechatpadpro", admin: bool = True):
+        self.message_str = message
+        self.unified_msg_origin = origin
+        self.platform_name = platform
+        self.admin = admin
+
+    def get_message_str(self):
+        return self.message_str
+
+    def get_platform_name(self):
+        return self.platform_name
+
+    def get_messages(self):
+        return []
+
+    def get_sender_id(self):
+        return self.unified_msg_origin.rsplit(":", 1)[-1]
+
+    def is_admin(self):
+        return self.admin
+
+    def plain_result(self, text: str):
+        return text
@@ -0,0 +1,58 @@
+"""测量每个任务在内存中的占用
+
+对比旧的字典表示（含 cron_h / created_at 等字符串）和 Task 对象。
+用法: python bench/task_memory.py [任务数量]
+"""
+import importlib
+import os
+import sys
+import tracemalloc
+
+# 插件目录作为包导入（插件内部使用相对导入）
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+Task = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.task").Task
+
+ORIGINS = [f"wechatpadpro:GroupMessage:{i}@chatroom" for i in range(50)]
+
+
+def make_dicts(n: int) -> list:
+    tasks = []
+    for i in range(n):
+        origin = "".join(ORIGINS[i % len(ORIGINS)])  # 模拟从 JSON 解析出来的独立字符串
+        tasks.append((origin, {
+            "id": str(i).zfill(6),
+            "content": f"提醒 {i}",
+            "use_gpt": False,
+            "group_name": f"群{i % 50}",
+            "created_at": "2025-03-30 16:30:00",
+            "cron": "0 9 * * *",
+            "cron_h": "循环<在 09:00>",
+        }))
+    return tasks
+
+
+def make_tasks(n: int) -> list:
+    return [Task.from_dict(origin, data) for origin, data in make_dicts(n)]
+
+
+def measure(factory, n: int) -> float:
+    tracemalloc.start()
+    data = factory(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dict_bytes = measure(make_dicts, n)
+    task_bytes = measure(make_tasks, n)
+    print(f"任务数: {n}")
+    print(f"dict: {dict_bytes:.0f} 字节/任务")
+    print(f"Task: {task_bytes:.0f} 字节/任务 ({task_bytes / dict_bytes:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import re
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Union
+
+from .triggers import cron_cache
+
+# 错过触发时的补发策略
+CATCHUP_POLICIES = ("skip", "once", "all")
+# 上一次运行还没结束时又到了触发时间的处理：跳过、排队、取消上一次
+OVERLAP_POLICIES = ("skip", "queue", "replace")
+
+# 一次扫描切分出所有记号：带方括号的选项（括号内可以有空格，如 cron[0 9 * * *]）或不含空白的词。
+# 记号直接使用 re.Match：[0] 为原文，start() 为位置，选项的 kw、value 分别是名称和方括号中的内容
+_TOKEN = re.compile(r"(?P<kw>cron|group|origin|catchup|timeout|overlap)\[(?P<value>[^\]]*)\]|\S+")
+_UNCLOSED_OPTION = re.compile(r"(?:cron|group|origin|catchup|timeout|overlap)\[")
+# 发送目标只能作为独立的记号写在末尾，写在其他位置或与内容连在一起时报错，不会被当成内容发到当前会话
+_TARGET_OPTION = re.compile(r"(?:group|origin)\[")
+
+# 分钟可以只写一位，如 8:5
+_TIME = re.compile(r"(\d{1,2})[:：](\d{1,2})")
+_TIME_RANGE = re.compile(r"(\d{1,2})[:：](\d{1,2})[-~～至](\d{1,2})[:：](\d{1,2})")
+_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_EVERY_N = re.compile(r"每(\d+)(秒钟?|分钟|小时)")
+_AFTER_N = re.compile(r"(\d+)(分钟|小时|天)后")
+_MONTHLY = re.compile(r"每月(\d{1,2})[号日]")
+
+_RELATIVE_DAYS = {"今天": 0, "明天": 1, "后天": 2}
+# APScheduler 的 cron 星期从 0=周一 开始
+_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+_UNITS = {"分钟": timedelta(minutes=1), "小时": timedelta(hours=1), "天": timedelta(days=1)}
+_INTERVAL_UNITS = {"秒": 1, "秒钟": 1, "分钟": 60, "小时": 3600}
+
+
+class ParseError(ValueError):
+    """命令格式错误，position 是出错位置在命令中的字符下标"""
+
+    def __init__(self, message: str, position: int, token: str = ""):
+        super().__init__(message)
+        self.message = message
+        self.position = position
+        self.token = token
+
+    def __str__(self):
+        where = f"第{self.position + 1}个字符"
+        if self.token:
+            where += f"「{self.token}」"
+        return f"{where}: {self.message}"
+
+
+def _error(token: re.Match, message: str) -> ParseError:
+    return ParseError(message, token.start(), token[0])
+
+
+def tokenize(text: str) -> list[re.Match]:
+    tokens = list(_TOKEN.finditer(text))
+    for token in tokens:
+        if token["kw"] is None and "[" in token[0] and _UNCLOSED_OPTION.match(token[0]):
+            raise _error(token, "缺少 ]")
+    return tokens
+
+
+def parse_command(text: str, now: Optional[datetime] = None) -> dict:
+    """解析创建任务的命令（不含开头的 /time），返回解析结果字典，格式错误时抛出 ParseError
+
+    语法: [选项] <时间> [选项] <内容> [GPT] [group[群名,...]] [origin[消息来源,...]]
+    选项为 GPT、catchup[skip|once|all]、timeout[秒数]、overlap[skip|queue|replace]。时间为以下之一：
+    - cron[<表达式>]
+    - <日期> <时:分>，日期为 2025-03-30、今天、明天、后天
+    - N分钟后、N小时后、N天后
+    - [每天|工作日|每周X|每月N号] <时:分>
+    - 每N秒|每N分钟|每N小时，从创建时起每隔N触发一次（间隔任务）
+    - [每天|工作日|每周X|每月N号] [<时:分>-<时:分>] 每N分钟|每N小时，按整点对齐，时间范围不包含结束时间
+
+    返回的字典中 cron、run_at（一次性任务的时间戳）和 interval（间隔秒数）三选一。
+    """
+    return _Parser(text, now or datetime.now()).parse()
+
+
+def parse_commands(texts: Iterable[str], now: Optional[datetime] = None) -> list[Union[dict, ParseError]]:
+    """批量解析，所有命令使用同一个当前时间，出错的命令对应位置是 ParseError"""
+    now = now or datetime.now()
+    results = []
+    for text in texts:
+        try:
+            results.append(_Parser(text, now).parse())
+        except ParseError as e:
+            results.append(e)
+    return results
+
+
+class _Parser:
+    def __init__(self, text: str, now: datetime):
+        self.text = text
+        self.now = now
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.catchup_token: Optional[re.Match] = None
+        self.result = {
+            "use_gpt": False,
+            "group_name": None,
+            "group_names": [],  # 多个群名，如 group[a,b,c]
+            "origins": [],  # 直接指定的消息来源，如 origin[aiocqhttp:GroupMessage:123,...]
+            "content": None,
+            "cron": None,
+            "run_at": None,
+            "interval": None,
+            "catchup": None,  # 错过触发时的补发策略
+            "timeout": None,  # GPT 生成的超时秒数
+            "overlap": None,  # 上一次运行未结束时的重叠策略
+        }
+
+    def parse(self) -> dict:
+        end = self._parse_targets()
+        self._parse_options(end)
+        self._parse_schedule(end)
+        self._parse_options(end)
+        if self.pos >= end:
+            raise ParseError("消息内容不能为空", len(self.text.rstrip()))
+        if self.result["interval"] is not None and self.catchup_token is not None:
+            raise _error(self.catchup_token, "间隔任务不补发错过的触发，不能指定 catchup")
+        # 内容保留原文中的空白
+        self.result["content"] = self.text[self.tokens[self.pos].start():self.tokens[end - 1].end()]
+        return self.result
+
+    def _parse_targets(self) -> int:
+        """命令末尾的 group[...]、origin[...] 和 GPT，返回其余记号的结束下标"""
+        end = len(self.tokens)
+        while end and (self.tokens[end - 1]["kw"] in ("group", "origin") or self.tokens[end - 1][0] == "GPT"):
+            token = self.tokens[end - 1]
+            if token[0] == "GPT":
+                # 兼容旧写法：GPT 写在内容之后
+                self.result["use_gpt"] = True
+                end -= 1
+                continue
+            targets = list(dict.fromkeys(t.strip() for t in token["value"].replace("，", ",").split(",") if t.strip()))
+            if not targets:
+                raise _error(token, "没有指定发送目标")
+            if token["kw"] == "group":
+                if self.result["group_names"]:
+                    raise _error(token, "group[...] 重复")
+                self.result["group_names"] = targets
+                self.result["group_name"] = ",".join(targets)
+            else:
+                if self.result["origins"]:
+                    raise _error(token, "origin[...] 重复")
+                self.result["origins"] = targets
+            end -= 1
+        if self.result["group_names"] and self.result["origins"]:
+            # 群名和群ID是一一对应显示、导出的，两种写法不能混用
+            raise _error(self.tokens[end], "group[...] 和 origin[...] 不能同时使用，请都写成 origin[...]")
+        for token in self.tokens[:end]:
+            if match := _TARGET_OPTION.search(token[0]):
+                raise ParseError(
+                    f"{match[0]}...] 只能作为独立的一项写在命令末尾，与内容之间用空格分开",
+                    token.start() + match.start(),
+                    token[0],
+                )
+        return end
+
+    def _parse_options(self, end: int):
+        """GPT、catchup[...]、timeout[...]、overlap[...]，可以写在时间之前或之后、内容之前"""
+        while self.pos < end:
+            token = self.tokens[self.pos]
+            if token[0] == "GPT":
+                self.result["use_gpt"] = True
+            elif token["kw"] == "catchup":
+                if token["value"] not in CATCHUP_POLICIES:
+                    raise _error(token, f"补发策略只能是 {'/'.join(CATCHUP_POLICIES)}")
+                self.result["catchup"] = token["value"]
+                self.catchup_token = token
+            elif token["kw"] == "timeout":
+                if not token["value"].isdigit():
+                    raise _error(token, "超时时间应为秒数，0 表示不限制")
+                self.result["timeout"] = int(token["value"])
+            elif token["kw"] == "overlap":
+                if token["value"] not in OVERLAP_POLICIES:
+                    raise _error(token, f"重叠策略只能是 {'/'.join(OVERLAP_POLICIES)}")
+                self.result["overlap"] = token["value"]
+            else:
+                return
+            self.pos += 1
+
+    def _next(self, end: int, expected: str) -> re.Match:
+        if self.pos >= end:
+            raise ParseError(f"缺少{expected}", len(self.text.rstrip()))
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def _parse_schedule(self, end: int):
+        """按第一个记号的写法分派，循环任务编译成 cron 表达式，间隔任务取出间隔秒数，一次性任务计算出触发时间"""
+        token = self._next(end, "时间")
+        text = token[0]
+        keyword = token["kw"]
+        if keyword == "cron":
+            self._set_cron(token["value"], token)
+            return
+        if keyword is not None:
+            raise _error(token, "缺少时间")
+
+        if text in _RELATIVE_DAYS:
+            hour, minute = self._parse_time(self._next(end, "时间（时:分）"))
+            day = self.now + timedelta(days=_RELATIVE_DAYS[text])
+            self._set_run_at(day.replace(hour=hour, minute=minute, second=0, microsecond=0), token)
+            return
+
+        if text[0].isdigit():
+            if match := _AFTER_N.fullmatch(text):
+                amount = int(match.group(1))
+                if amount <= 0:
+                    raise _error(token, "时长必须大于0")
+                # 向上取整到分钟，一次性任务的时间精确到分钟
+                run_time = self.now + amount * _UNITS[match.group(2)]
+                if run_time.second or run_time.microsecond:
+                    run_time = run_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+                self._set_run_at(run_time, token)
+                return
+            if match := _DATE.fullmatch(text):
+                hour, minute = self._parse_time(self._next(end, "时间（时:分）"))
+                try:
+                    run_time = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)), hour, minute)
+                except ValueError:
+                    raise _error(token, "日期无效")
+                self._set_run_at(run_time, token)
+                return
+
+        # 循环任务：[日期] <时:分> 或 [日期] [时间范围] <间隔>，后者的日期可以省略（每天）
+        day_of_month, day_of_week = "*", "*"
+        if match := _EVERY_N.fullmatch(text):
+            # 不带日期和时间范围的间隔：从创建时起计时，由间隔任务引擎调度
+            self._set_interval(int(match.group(1)), match.group(2), token)
+            return
+        if text == "每天":
+            token = self._next(end, "时间")
+        elif text == "工作日":
+            day_of_week = "0-4"
+            token = self._next(end, "时间")
+        elif text.startswith("每周") and len(text) == 3:
+            if text[2] not in _WEEKDAYS:
+                raise _error(token, "星期只能是 一二三四五六日")
+            day_of_week = str(_WEEKDAYS[text[2]])
+            token = self._next(end, "时间")
+        elif match := _MONTHLY.fullmatch(text):
+            day = int(match.group(1))
+            if not 1 <= day <= 31:
+                raise _error(token, "日期只能是 1-31 号")
+            day_of_month = str(day)
+            token = self._next(end, "时间")
+        elif not _TIME_RANGE.fullmatch(text):
+            raise _error(token, "无法识别的时间，支持 每天/工作日/每周X/每月N号/今天/明天/后天/日期/N小时后/每N分钟/cron[...]")
+
+        if match := _TIME.fullmatch(token[0]):
+            hour, minute = self._check_time(match, token)
+            self._set_cron(f"{minute:02d} {hour:02d} {day_of_month} * {day_of_week}", token)
+            return
+
+        time_range = None
+        if match := _TIME_RANGE.fullmatch(token[0]):
+            start_hour, start_minute = self._check_time(match, token)
+            stop_hour, stop_minute = self._check_time(match, token, 3)
+            start, stop = start_hour * 60 + start_minute, stop_hour * 60 + stop_minute
+            if stop <= start:
+                raise _error(token, "结束时间必须晚于开始时间")
+            time_range = (start, stop, token)
+            token = self._next(end, "间隔（每N分钟/每N小时）")
+        match = _EVERY_N.fullmatch(token[0])
+        if not match:
+            raise _error(token, "需要时:分或每N分钟/每N小时")
+        minute, hour = self._interval_fields(int(match.group(1)), match.group(2), time_range, token)
+        self._set_cron(f"{minute} {hour} {day_of_month} * {day_of_week}", token)
+
+    def _interval_fields(
+        self, interval: int, unit: str, time_range: Optional[tuple], token: re.Match
+    ) -> tuple[str, str]:
+        """每N分钟/每N小时对应的 cron (分, 时) 字段，时间范围不包含结束时间"""
+        if interval <= 0:
+            raise _error(token, "间隔必须大于0")
+        if unit.startswith("秒"):
+            raise _error(token, "按秒的间隔不能指定日期和时间范围")
+        if unit == "分钟":
+            if 60 % interval:
+                raise _error(token, "分钟间隔需要能整除60，如 5、10、15、30")
+            minute = "*" if interval == 1 else f"*/{interval}"
+            if time_range is None:
+                return minute, "*"
+            start, stop, range_token = time_range
+            if start % 60 or stop % 60:
+                raise _error(range_token, "按分钟间隔时，时间范围只能是整点")
+            return minute, self._hour_range(start // 60, stop // 60 - 1, 1)
+
+        if time_range is None:
+            if 24 % interval:
+                raise _error(token, "小时间隔需要能整除24，如 2、3、4、6、12")
+            return "0", "*" if interval == 1 else f"*/{interval}"
+        # 从开始时间起每N小时，最后一次早于结束时间
+        start, stop, _ = time_range
+        minute = start % 60
+        return str(minute), self._hour_range(start // 60, (stop - 1 - minute) // 60, interval)
+
+    @staticmethod
+    def _hour_range(first: int, last: int, step: int) -> str:
+        if last == first:
+            return str(first)
+        return f"{first}-{last}" if step == 1 else f"{first}-{last}/{step}"
+
+    def _parse_time(self, token: re.Match) -> tuple[int, int]:
+        match = _TIME.fullmatch(token[0])
+        if not match:
+            raise _error(token, "时间格式应为 时:分，如 08:30")
+        return self._check_time(match, token)
+
+    @staticmethod
+    def _check_time(match: re.Match, token: re.Match, group: int = 1) -> tuple[int, int]:
+        """取出 match 中从第 group 组开始的时、分并检查范围"""
+        hour, minute = int(match.group(group)), int(match.group(group + 1))
+        if not (0 <= hour <= 23 and 0 <= minute <= 59):
+            raise _error(token, "时间超出范围，小时为 0-23，分钟为 0-59")
+        return hour, minute
+
+    def _set_cron(self, expr: str, token: re.Match):
+        try:
+            # 校验表达式，编译好的触发器留在缓存中，调度时直接复用
+            cron_cache.trigger(expr)
+        except ValueError as e:
+            raise _error(token, f"cron 表达式无效: {e}")
+        self.result["cron"] = expr
+
+    def _set_interval(self, amount: int, unit: str, token: re.Match):
+        if amount <= 0:
+            raise _error(token, "间隔必须大于0")
+        self.result["interval"] = amount * _INTERVAL_UNITS[unit]
+
+    def _set_run_at(self, run_time: datetime, token: re.Match):
+        if run_time <= self.now:
+            raise _error(token, f"设置的时间 {run_time.strftime('%Y-%m-%d %H:%M')} 早于当前时间，请设置未来的时间")
+        self.result["run_at"] = int(run_time.timestamp())
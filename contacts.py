@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Optional
+
+from astrbot.api import logger
+
+
+class ContactDirectoryError(Exception):
+    """获取联系人列表失败"""
+
+
+class _Directory:
+    __slots__ = ("names", "fetched_at")
+
+    def __init__(self, names: dict, fetched_at: float):
+        # nickName -> userName
+        self.names = names
+        self.fetched_at = fetched_at
+
+
+class ContactDirectory:
+    """按平台缓存的联系人目录，用于把 group[群名] 解析成群ID
+
+    - 缓存未过期时直接查字典
+    - 缓存过期后先用旧数据返回，同时在后台刷新
+    - 查不到时强制刷新一次（同一平台 miss_refresh_interval 秒内最多一次），以便找到新加入的群
+    - 同一平台同时只有一个刷新请求，其余调用等待它的结果
+    """
+
+    def __init__(self, ttl: float = 600, miss_refresh_interval: float = 30):
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._directories: dict[str, _Directory] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def resolve(self, platform_name: str, platform, nick_name: str) -> Optional[str]:
+        """根据昵称查找 userName，找不到返回 None，获取联系人失败时抛出 ContactDirectoryError"""
+        directory = self._directories.get(platform_name)
+        if directory is None:
+            directory = await self.refresh(platform_name, platform)
+        elif time.monotonic() - directory.fetched_at > self.ttl:
+            # 过期：先用旧数据，后台刷新
+            self._start_refresh(platform_name, platform)
+
+        user_name = directory.names.get(nick_name)
+        if user_name is None and time.monotonic() - directory.fetched_at > self.miss_refresh_interval:
+            logger.debug(f"联系人缓存未命中，强制刷新: {nick_name}")
+            directory = await self.refresh(platform_name, platform)
+            user_name = directory.names.get(nick_name)
+        return user_name
+
+    async def refresh(self, platform_name: str, platform) -> _Directory:
+        """刷新指定平台的联系人目录，并发调用会共享同一次刷新"""
+        task = self._start_refresh(platform_name, platform)
+        return await asyncio.shield(task)
+
+    def _start_refresh(self, platform_name: str, platform) -> asyncio.Task:
+        task = self._refreshing.get(platform_name)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(platform_name, platform))
+            task.add_done_callback(self._log_background_failure)
+            self._refreshing[platform_name] = task
+        return task
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"刷新联系人缓存失败: {task.exception()}")
+
+    async def _fetch(self, platform_name: str, platform) -> _Directory:
+        # 获取联系人id列表
+        contact_ids = await platform.get_contact_list()
+        if not contact_ids:
+            raise ContactDirectoryError("获取联系人id列表为空")
+
+        contact_details = await platform.get_contact_details_list([], contact_ids)
+        if not contact_details:
+            raise ContactDirectoryError("获取联系人信息为空")
+
+        names = {}
+        for contact in contact_details:
+            contact_name = contact.get("nickName", {}).get('str', '')
+            user_name = contact.get("userName", {}).get('str', '')
+            # 重名时保留第一个，与之前线性查找的结果一致
+            if contact_name and user_name and contact_name not in names:
+                names[contact_name] = user_name
+
+        directory = _Directory(names, time.monotonic())
+        self._directories[platform_name] = directory
+        logger.debug(f"联系人缓存已刷新: platform={platform_name}, 共{len(names)}个")
+        return directory
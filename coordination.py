@@ -0,0 +1,83 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from astrbot.api import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LeaderLock:
+    """基于文件锁的主实例选举
+
+    多个进程共用同一个数据目录时，只有持有 leader.lock 排他锁的进程是主实例，负责调度和写入。
+    其他进程作为备用实例在后台线程中阻塞等待这把锁；主实例退出（包括崩溃）时操作系统自动释放锁，
+    备用实例立即获得锁并接管，不需要等待租约过期。
+    """
+
+    def __init__(self, path: str, on_elected: Callable[[], None]):
+        self.path = path
+        # 备用实例成为主实例时在事件循环中调用
+        self.on_elected = on_elected
+        self.is_leader = False
+        self._file = open(path, "a+")
+        self._thread: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        """尝试立即获得锁，失败时在后台等待，获得后调用 on_elected"""
+        if self._lock(blocking=False):
+            self._elected()
+            return True
+        loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._wait, args=(loop,), name="timetask-leader", daemon=True)
+        self._thread.start()
+        return False
+
+    def _lock(self, blocking: bool) -> bool:
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                return True
+            except OSError:
+                return False
+        # Windows 没有阻塞的文件锁，轮询
+        while True:
+            try:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(1)
+
+    def _wait(self, loop: asyncio.AbstractEventLoop):
+        try:
+            self._lock(blocking=True)
+        except ValueError:
+            # 等待期间插件已停止，文件已关闭
+            return
+        if self._file.closed:
+            return
+        self._elected()
+        loop.call_soon_threadsafe(self.on_elected)
+
+    def _elected(self):
+        self.is_leader = True
+        # 记录主实例的进程号，方便排查
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(os.getpid()))
+        self._file.flush()
+        logger.info(f"当前进程({os.getpid()})成为定时任务主实例")
+
+    def release(self):
+        """关闭锁文件即释放锁，备用实例随即接管"""
+        self.is_leader = False
+        self._file.close()
@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
+
+from apscheduler.events import EVENT_JOB_MISSED
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.base import STATE_RUNNING
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from astrbot.api import logger
+
+
+class _Entry:
+    __slots__ = ("task_id", "trigger", "func", "args", "fire_time", "materialized", "removed")
+
+    def __init__(self, task_id: str, trigger, func: Callable, args: list):
+        self.task_id = task_id
+        self.trigger = trigger
+        self.func = func
+        self.args = args
+        self.fire_time: Optional[datetime] = None
+        # 是否已经作为 APScheduler 的 job 存在
+        self.materialized = False
+        self.removed = False
+
+
+class HorizonScheduler:
+    """按时间窗口懒加载任务的调度器
+
+    所有任务只在内存中保存触发器和下次触发时间（按时间排序的堆），
+    只有下次触发时间落在 horizon 秒以内的任务才会作为一次性 job 加入 APScheduler。
+    每隔 horizon / 4 秒把新进入窗口的任务加入调度器；任务触发后计算下一次触发时间，
+    仍在窗口内就直接再加入，否则放回堆中等待。
+
+    这样 APScheduler 中的 job 数量只取决于近期要触发的任务数，而不是任务总数。
+
+    已加入调度器的任务也按触发时间放在另一个堆中，两个堆合起来就是所有任务的下次触发时间索引，
+    iter_upcoming() / upcoming() 按触发顺序查询即将触发的任务，取前 k 个只需要 O(k log n)。
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        horizon: float = 3600,
+        misfire_grace_time: int = 60,
+        max_instances: int = 1,
+        on_materialize: Optional[Callable[[str, datetime], None]] = None,
+        on_fire: Optional[Callable[[str, datetime], None]] = None,
+    ):
+        self.scheduler = scheduler
+        self.horizon = timedelta(seconds=horizon)
+        self.misfire_grace_time = misfire_grace_time
+        # 同一任务的 job 同时运行的实例数上限，超过时 APScheduler 跳过这次触发
+        self.max_instances = max_instances
+        # job 加入 APScheduler 时的回调，参数为 (任务ID, 触发时间)
+        self.on_materialize = on_materialize
+        # job 开始执行时的回调，参数为 (任务ID, 计划触发时间)
+        self.on_fire = on_fire
+
+        self._entries: dict[str, _Entry] = {}
+        # (触发时间, 序号, entry)，删除和改期采用惰性删除：弹出或遍历时检查是否仍然有效
+        # _heap 是窗口外等待加入调度器的任务，_scheduled 是已加入调度器的任务
+        self._heap: list[tuple[datetime, int, _Entry]] = []
+        self._scheduled: list[tuple[datetime, int, _Entry]] = []
+        self._seq = itertools.count()
+        self._materialized_count = 0
+
+        self.scheduler.add_job(
+            self.advance,
+            trigger=IntervalTrigger(seconds=max(horizon / 4, 1)),
+            id="timetask#horizon",
+            replace_existing=True,
+        )
+        self.scheduler.add_listener(self._on_missed, EVENT_JOB_MISSED)
+
+    def _now(self) -> datetime:
+        return datetime.now(self.scheduler.timezone)
+
+    def add(self, task_id: str, trigger, func: Callable, args: list):
+        """添加任务，已存在同ID的任务时替换"""
+        self.remove(task_id)
+        entry = _Entry(task_id, trigger, func, args)
+        self._entries[task_id] = entry
+        self._plan(entry, trigger.get_next_fire_time(None, self._now()))
+
+    def add_many(self, items: list[tuple[str, object, Callable, list]]):
+        """批量添加 [(任务ID, 触发器, 函数, 参数)]
+
+        - 相同 cron 表达式的任务共用同一个触发器对象，下次触发时间对同一时刻只计算一次
+        - 调度器运行中每次 add_job 都会唤醒一次调度器，批量添加期间先暂停，结束后只唤醒一次
+        """
+        now = self._now()
+        limit = now + self.horizon
+        next_times = {}
+        running = self.scheduler.state == STATE_RUNNING
+        if running:
+            self.scheduler.pause()
+        try:
+            for task_id, trigger, func, args in items:
+                self.remove(task_id)
+                entry = _Entry(task_id, trigger, func, args)
+                self._entries[task_id] = entry
+                key = id(trigger)
+                if key not in next_times:
+                    next_times[key] = trigger.get_next_fire_time(None, now)
+                self._plan(entry, next_times[key], limit)
+        finally:
+            if running:
+                self.scheduler.resume()
+
+    def remove(self, task_id: str) -> bool:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return False
+        entry.removed = True
+        if entry.materialized:
+            entry.materialized = False
+            self._materialized_count -= 1
+            try:
+                self.scheduler.remove_job(task_id)
+            except JobLookupError:
+                pass
+        return True
+
+    def modify(self, task_id: str, args: list) -> bool:
+        """替换任务执行时的参数，保留触发器和下次触发时间；job 只带任务ID，不需要改动调度器"""
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return False
+        entry.args = args
+        return True
+
+    def next_fire_time(self, task_id: str) -> Optional[datetime]:
+        entry = self._entries.get(task_id)
+        return entry.fire_time if entry else None
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def materialized_count(self) -> int:
+        return self._materialized_count
+
+    def iter_upcoming(self) -> Iterator[tuple[datetime, str]]:
+        """按触发时间从早到晚产出 (下次触发时间, 任务ID)
+
+        不修改堆，只取前几个时代价为 O(k log n)（另加跳过的已失效元素）。遍历期间不能添加或删除任务。
+        """
+        scheduled = (item for item in self._walk(self._scheduled) if self._is_current(item, True))
+        pending = (item for item in self._walk(self._heap) if self._is_current(item, False))
+        for fire_time, _, entry in heapq.merge(scheduled, pending):
+            yield fire_time, entry.task_id
+
+    def upcoming(self, limit: int) -> list[tuple[datetime, str]]:
+        """最近要触发的 limit 个任务 [(下次触发时间, 任务ID)]"""
+        return list(itertools.islice(self.iter_upcoming(), limit))
+
+    @staticmethod
+    def _walk(heap: list) -> Iterator[tuple]:
+        """按从小到大的顺序遍历堆而不弹出：辅助堆中保存待访问的下标，每产出一个元素加入它的两个子节点"""
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            item, i = heapq.heappop(frontier)
+            yield item
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    @staticmethod
+    def _is_current(item: tuple, materialized: bool) -> bool:
+        fire_time, _, entry = item
+        return not entry.removed and entry.materialized == materialized and entry.fire_time == fire_time
+
+    def _plan(self, entry: _Entry, fire_time: Optional[datetime], limit: Optional[datetime] = None):
+        """记录下次触发时间，窗口内的直接加入调度器，窗口外的放入堆中"""
+        if entry.materialized:
+            entry.materialized = False
+            self._materialized_count -= 1
+        entry.fire_time = fire_time
+        if fire_time is None:
+            # 触发器不会再触发（一次性任务已执行）
+            self._entries.pop(entry.task_id, None)
+            return
+        if fire_time <= (limit or self._now() + self.horizon):
+            self._materialize(entry)
+        else:
+            heapq.heappush(self._heap, (fire_time, next(self._seq), entry))
+
+    def _materialize(self, entry: _Entry):
+        self.scheduler.add_job(
+            self._fire,
+            trigger=DateTrigger(run_date=entry.fire_time),
+            args=[entry.task_id],
+            id=entry.task_id,
+            misfire_grace_time=self.misfire_grace_time,
+            max_instances=self.max_instances,
+            replace_existing=True,
+        )
+        entry.materialized = True
+        self._materialized_count += 1
+        heapq.heappush(self._scheduled, (entry.fire_time, next(self._seq), entry))
+        if self.on_materialize:
+            self.on_materialize(entry.task_id, entry.fire_time)
+
+    async def advance(self):
+        """把进入时间窗口的任务加入调度器
+
+        协程函数：APScheduler 把同步的 job 放进线程池执行，而堆和 job 只能在事件循环中修改。
+        """
+        limit = self._now() + self.horizon
+        count = 0
+        while self._heap and self._heap[0][0] <= limit:
+            fire_time, _, entry = heapq.heappop(self._heap)
+            # 已删除、已改期或已加入调度器的是过期的堆元素
+            if entry.removed or entry.materialized or entry.fire_time != fire_time:
+                continue
+            self._materialize(entry)
+            count += 1
+        # 已触发、已删除的元素到达堆顶时清理掉
+        while self._scheduled and not self._is_current(self._scheduled[0], True):
+            heapq.heappop(self._scheduled)
+        if count:
+            logger.debug(f"{count} 个任务进入调度窗口，当前窗口内共 {len(self.scheduler.get_jobs())} 个job")
+
+    def _reschedule(self, entry: _Entry, fire_time: datetime):
+        """根据本次触发时间计算下一次触发"""
+        now = self._now()
+        next_time = entry.trigger.get_next_fire_time(fire_time, now)
+        if next_time is not None and next_time < now:
+            # 错过的触发不补发，直接从当前时间往后算
+            next_time = entry.trigger.get_next_fire_time(None, now)
+        self._plan(entry, next_time)
+
+    async def _fire(self, task_id: str):
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return
+        fire_time = entry.fire_time
+        if self.on_fire:
+            self.on_fire(task_id, fire_time)
+        # 先安排下一次触发，再执行任务，任务出错也不影响之后的调度
+        self._reschedule(entry, fire_time)
+        await entry.func(*entry.args)
+
+    def _on_missed(self, event):
+        """job 错过了宽限时间没有执行，APScheduler 会直接删除它，这里安排下一次触发"""
+        entry = self._entries.get(event.job_id)
+        if entry is None or not entry.materialized:
+            return
+        logger.warning(f"任务 {event.job_id} 错过了触发时间 {event.scheduled_run_time}")
+        # 事件在 APScheduler 删除该 job 之前分发，等它删除后再加入同ID的新 job
+        asyncio.get_running_loop().call_soon(self._reschedule_missed, entry, event.scheduled_run_time)
+
+    def _reschedule_missed(self, entry: _Entry, fire_time: datetime):
+        if not entry.removed and entry.fire_time == fire_time:
+            self._reschedule(entry, fire_time)
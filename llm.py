@@ -0,0 +1,127 @@
+import asyncio
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from astrbot.api import logger
+
+
+class PrefetchCache:
+    """GPT 任务提前生成内容的缓存
+
+    每个任务最多保存一条：对应的触发时间、生成的内容和过期时间。
+    超过容量时淘汰最早放入的条目。
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[datetime, str, float]] = OrderedDict()
+
+    def put(self, task_id: str, fire_time: datetime, content: str):
+        self._entries.pop(task_id, None)
+        self._entries[task_id] = (fire_time, content, time.monotonic() + self.ttl)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def take(self, task_id: str, now: datetime, tolerance: float = 60) -> Optional[str]:
+        """取出任务在当前时刻对应的预生成内容
+
+        只有触发时间与 now 相差不超过 tolerance 秒且未过期的内容才会返回，
+        否则说明是上一次触发遗留的内容，直接丢弃。
+        """
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return None
+        fire_time, content, expires_at = entry
+        if time.monotonic() > expires_at:
+            return None
+        if abs((now - fire_time).total_seconds()) > tolerance:
+            return None
+        return content
+
+    def discard(self, task_id: str):
+        self._entries.pop(task_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LLMScheduler:
+    """统一调度所有任务的LLM调用
+
+    - 最多同时进行 max_concurrency 个调用，其余按先来后到排队
+    - 相同 Provider、相同提示词的调用还在进行时，新的调用等待同一个结果，不重复请求；
+      调用结束后即不再共享，之后相同提示词的调用（如间隔任务的下一次运行、失败后的重试）会重新生成
+    - 等待方被取消（如 /time cancel）时，共享的调用只有在没有其他等待方时才取消
+    - timeout 从拿到并发名额开始计时，只限制 Provider 调用本身，排队时间不算在内；
+      合并的调用使用第一个调用方的超时
+    """
+
+    def __init__(self, max_concurrency: int = 4, dedup: bool = True):
+        self.max_concurrency = max_concurrency
+        self.dedup = dedup
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # (provider, 提示词) -> 进行中的调用任务
+        self._calls: dict[tuple, asyncio.Task] = {}
+        # 调用任务 -> 等待它的任务数
+        self._waiters: dict[asyncio.Future, int] = {}
+        self.waiting = 0
+        self.running = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def text_chat(self, provider, prompt: str, timeout: float = 0):
+        """调用 Provider 生成回复，超过 timeout 秒（0 表示不限制）时取消调用并抛出 TimeoutError"""
+        if not self.dedup:
+            return await self._call(provider, prompt, timeout)
+
+        key = (id(provider), prompt)
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            logger.debug(f"合并相同的LLM请求: {prompt[:20]}")
+        else:
+            call = asyncio.ensure_future(self._call(provider, prompt, timeout))
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        # shield：某个等待方被取消时不影响其他共享结果的任务，最后一个等待方被取消时才取消调用
+        self._waiters[call] = self._waiters.get(call, 0) + 1
+        try:
+            return await asyncio.shield(call)
+        except asyncio.CancelledError:
+            if self._waiters[call] == 1 and not call.done():
+                call.cancel()
+            raise
+        finally:
+            self._waiters[call] -= 1
+            if not self._waiters[call]:
+                del self._waiters[call]
+
+    async def _call(self, provider, prompt: str, timeout: float):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            if timeout > 0:
+                try:
+                    return await asyncio.wait_for(provider.text_chat(prompt), timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    raise TimeoutError(f"LLM调用超过 {timeout} 秒没有完成")
+            return await provider.text_chat(prompt)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+
+def task_jitter(task_id: str, max_jitter: float) -> float:
+    """根据任务ID计算固定的抖动秒数，同一任务每次结果相同，不同任务均匀分布在 [0, max_jitter] 内"""
+    if max_jitter <= 0:
+        return 0
+    return zlib.crc32(task_id.encode("utf-8")) % 1000 / 1000 * max_jitter
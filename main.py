@@ -1,231 +1,832 @@
-import json
+import asyncio
+import heapq
+import itertools
 import os
-import random
-import string
+import re
+import time as time_module
 from datetime import datetime
-from typing import Optional
-from uuid import uuid4
+from typing import TYPE_CHECKING, Collection, Optional
+from collections import deque
 from datetime import timedelta
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_MISSED
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 
 from astrbot.core.message.message_event_result import MessageChain
-from astrbot.core.platform.sources.wechatpadpro.wechatpadpro_adapter import WeChatPadProAdapter
 from astrbot.core.platform.message_type import MessageType
 
 from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
 from astrbot.api.star import Context, Star, register
-from astrbot.api import logger
+from astrbot.api import logger, AstrBotConfig
+from astrbot.api.message_components import File
+
+from .command_parser import CATCHUP_POLICIES, OVERLAP_POLICIES, ParseError, parse_command, parse_commands
+from .contacts import ContactDirectory, ContactDirectoryError
+from .coordination import LeaderLock
+from .horizon import HorizonScheduler
+from .llm import LLMScheduler, PrefetchCache, task_jitter
+from .metrics import Metrics
+from .reload import FileWatcher, parse_tasks
+from .retry import RetryEntry, RetryQueue
+from .runs import SKIPPED, RunManager
+from .sender import OutboundSender
+from .store import TaskStore
+from .task import IdAllocator, Task, format_timestamp
+from .tick import TickEngine
+from .triggers import cron_cache
+
+if TYPE_CHECKING:
+    # 只用于类型标注：导入平台适配器会连带导入它的全部依赖，没有使用该平台时不需要
+    from astrbot.core.platform.sources.wechatpadpro.wechatpadpro_adapter import WeChatPadProAdapter
+
+LOADING_MESSAGE = "定时任务正在加载（已用时{:.1f}秒），请稍后再试"
+
+# 后台加载任务时，每处理这么多个任务让出一次事件循环
+LOAD_BATCH_SIZE = 1000
+
+# /time next 最多显示的条数
+NEXT_MAX_LIMIT = 50
+
+# 导出/导入时消息内容的转义：反斜杠写作 \\，换行写作 \n
+IMPORT_ESCAPE = re.compile(r"\\([\\n])")
+
+# /time ls 的类型过滤
+LS_FILTERS = {
+    "cron": lambda task: not task.is_once,
+    "once": lambda task: task.is_once,
+    "gpt": lambda task: task.use_gpt,
+}
 
 @register("timetask", "ZW", "定时发送消息到指定群聊。用法: /time <时间> [GPT] <内容> [<群名>]", "v0.1")
 class MyPlugin(Star):
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, config: Optional[AstrBotConfig] = None):
         super().__init__(context)
+        self.config = config or {}
         self.scheduler = AsyncIOScheduler(timezone="Asia/Shanghai")
         
-        # 创建目录
-        if not os.path.exists("data/timetask"):
-            os.makedirs("data/timetask")
+        # 多进程部署：leader 模式下只有主实例调度和写入
+        data_dir = "data/timetask"
+        self.coordination = self.config.get("coordination", "none")
+        
+        # 任务持久化：json 为快照 + 追加日志，sqlite 为单行读写的数据库，写入都在后台线程中合并进行
+        storage_backend = self.config.get("storage_backend", "json")
+        if storage_backend == "sqlite":
+            # 只有使用 sqlite 存储时才导入 sqlite3
+            from .sqlite_store import SqliteTaskStore
+            self.store = SqliteTaskStore(
+                data_dir,
+                flush_interval=self.config.get("flush_interval", 1.0),
+            )
+        else:
+            self.store = TaskStore(
+                data_dir,
+                flush_interval=self.config.get("flush_interval", 1.0),
+                compact_threshold=self.config.get("compact_threshold", 1000),
+            )
+            
+        # 任务按消息来源分组：{msg_origin: {task_id: Task}}
+        self.tasks = {}
+        # 任务ID索引：{task_id: Task}，与 self.tasks 同步维护
+        self.task_index = {}
+        # 按所属会话（创建任务的会话）分组：{owner: {task_id: Task}}，用于 /time ls
+        self.owner_index = {}
+        self.id_allocator = IdAllocator(self.task_index)
+        
+        # GPT任务提前生成内容：提前量(秒)，0 表示不预生成
+        self.prefetch_lead = self.config.get("gpt_prefetch_lead", 60)
+        self.prefetch_cache = PrefetchCache(
+            max_size=self.config.get("gpt_prefetch_cache_size", 1000),
+            ttl=self.prefetch_lead + 120,
+        )
+        
+        # LLM调用调度：限制并发、合并相同提示词，按任务固定抖动分散整点的调用
+        self.llm = LLMScheduler(
+            max_concurrency=self.config.get("llm_max_concurrency", 4),
+            dedup=self.config.get("llm_dedup", True),
+        )
+        self.llm_jitter = self.config.get("llm_jitter", 0)
+        
+        # 消息发送管道：按平台限速排队
+        self.sender = OutboundSender(
+            self.context.send_message,
+            rate=self.config.get("send_rate", 5),
+            burst=self.config.get("send_burst", 10),
+            max_queue=self.config.get("send_queue_size", 1000),
+            platform_limits=OutboundSender.parse_limits(self.config.get("send_platform_limits", [])),
+            send_timeout=self.config.get("send_timeout", 30),
+        )
+        
+        # LLM调用的默认超时秒数（0 表示不限制），任务可以用 timeout[...] 单独指定；
+        # 从拿到LLM并发名额开始计时，排队等待的时间不算在内
+        self.run_timeout = self.config.get("run_timeout", 300)
         
-        # 创建数据文件
-        if not os.path.exists("data/timetask/tasks.json"):
-            with open("data/timetask/tasks.json", "w", encoding="utf-8") as f:
-                f.write("{}")
-                logger.info("没有找到任务配置文件，创建data/timetask/tasks.json")
+        # 每次运行的重叠控制：被 /time cancel 取消时，正在等待的LLM调用和发送一起取消
+        overlap_policy = self.config.get("overlap_policy", "skip")
+        if overlap_policy not in OVERLAP_POLICIES:
+            logger.warning(f"未知的重叠策略 {overlap_policy}，使用 skip")
+            overlap_policy = "skip"
+        self.runs = RunManager(overlap=overlap_policy)
+        
+        # 发送失败和LLM生成失败的重试：指数退避，每个任务在成功或放弃前最多重试 retry_max_attempts 次
+        self.retry_queue = RetryQueue(
+            os.path.join(self.store.data_dir, "retry.json"),
+            self._retry_delivery,
+            max_attempts=self.config.get("retry_max_attempts", 5),
+            base_delay=self.config.get("retry_base_delay", 30),
+            max_delay=self.config.get("retry_max_delay", 3600),
+            max_size=self.config.get("retry_queue_size", 1000),
+        )
+        
+        # 多目标任务每个目标最近一次的发送结果：{task_id: {msg_origin: 状态}}，只保存在内存中
+        self.delivery_status = {}
+        
+        # 任务执行统计：触发延迟、LLM耗时、发送耗时、失败和错过触发次数
+        self.metrics = Metrics(max_tasks=self.config.get("metrics_max_tasks", 1000))
+        self.scheduler.add_listener(self._on_job_event, EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+        
+        # 错过触发的补发：默认策略、最多补发多久以前的、all 策略每个任务最多补发几次，
+        # 重启后的补发从启动 catchup_delay 秒后开始，每次间隔 catchup_stagger 秒
+        self.catchup_policy = self.config.get("catchup_policy", "once")
+        if self.catchup_policy not in CATCHUP_POLICIES:
+            logger.warning(f"未知的补发策略 {self.catchup_policy}，使用 once")
+            self.catchup_policy = "once"
+        self.catchup_max_age = self.config.get("catchup_max_age", 86400)
+        self.catchup_max_runs = self.config.get("catchup_max_runs", 10)
+        self.catchup_delay = self.config.get("catchup_delay", 10)
+        self.catchup_stagger = self.config.get("catchup_stagger", 2)
+        self._catchup_seq = itertools.count()
+        
+        # 按时间窗口懒加载：只有 schedule_horizon 秒内要触发的任务才加入 APScheduler
+        self.horizon = HorizonScheduler(
+            self.scheduler,
+            horizon=self.config.get("schedule_horizon", 3600),
+            misfire_grace_time=self.config.get("misfire_grace_time", 60),
+            # 同一任务的运行可能重叠（排队等待上一次），是否允许由 self.runs 按重叠策略决定
+            max_instances=3,
+            on_materialize=self._on_task_materialized,
+            on_fire=self._on_task_fire,
+        )
+        
+        # 间隔任务（每N秒/分钟/小时）不占用 APScheduler 的 job，同一秒到期的任务一起分发
+        self.tick = TickEngine(self._dispatch_tick, self.scheduler.timezone)
+        self.min_interval = self.config.get("min_interval", 10)
+        
+        # 定期把统计写成 Prometheus 文本文件，0 表示不导出
+        self.metrics_path = os.path.join(self.store.data_dir, "metrics.prom")
+        metrics_interval = self.config.get("metrics_export_interval", 0)
+        if metrics_interval > 0:
+            self.scheduler.add_job(
+                self._export_metrics,
+                trigger="interval",
+                seconds=metrics_interval,
+                id="timetask#metrics",
+                replace_existing=True,
+            )
+        
+        # 轮询 tasks.json，被手动或其他工具修改时只应用变化的任务，0 表示不监视
+        # 监视在任务加载完、启动时的快照写入之后才开始，以那时的 tasks.json 为基准
+        self.task_watcher = None
+        reload_interval = self.config.get("reload_interval", 5)
+        if self.store.reloadable and reload_interval > 0:
+            self.scheduler.add_job(
+                self._check_task_file,
+                trigger="interval",
+                seconds=reload_interval,
+                id="timetask#reload",
+                replace_existing=True,
+            )
+        
+        # 联系人目录缓存，用于 group[群名] 解析
+        self.contacts = ContactDirectory(ttl=self.config.get("contact_cache_ttl", 600))
+        
+        # leader 模式下拿不到锁的是备用实例：不加载任务、不调度也不写入，成为主实例时再加载
+        self.leader_lock = None
+        self.standby = False
+        if self.coordination == "leader":
+            self.leader_lock = LeaderLock(os.path.join(data_dir, "leader.lock"), self._take_over)
+            self.standby = not self.leader_lock.acquire()
+            if self.standby:
+                logger.info("其他进程是定时任务主实例，当前进程作为备用实例等待接管")
+        
+        # 任务在调度器启动后由后台任务加载，不阻塞 AstrBot 启动；加载完成前命令回复稍后再试
+        self.ready = False
+        self.load_error = None
+        self._load_started = time_module.monotonic()
+        self._load_seconds = None
+        self._loading: Optional[asyncio.Task] = None
+        self.scheduler.start(paused=self.standby)
+        if not self.standby:
+            self._loading = asyncio.create_task(self._restore_tasks())
     
-        with open("data/timetask/tasks.json", "r", encoding="utf-8") as f:
-            logger.debug("加载任务配置文件")
-            tasks_data = json.load(f)
+    def _unavailable_result(self, event: AstrMessageEvent) -> Optional[MessageEventResult]:
+        """备用实例、任务还没加载完或加载失败时命令的回复，可以处理命令时返回 None
+        
+        备用实例返回不带内容的结果并停止事件传播：同一条命令由主实例回复，用户不会收到两条回复。
+        """
+        if self.standby:
+            return MessageEventResult().stop_event()
+        if self.load_error:
+            return event.plain_result(f"定时任务加载失败，请检查日志: {self.load_error}")
+        if not self.ready:
+            return event.plain_result(LOADING_MESSAGE.format(time_module.monotonic() - self._load_started))
+        return None
+    
+    async def _restore_tasks(self):
+        """在后台从存储中加载任务，移除过期的一次性任务并加入调度器
+        
+        读取、解析文件和生成快照在线程中进行，其余步骤分批执行并让出事件循环，加载期间机器人照常响应。
+        """
+        self._load_started = time_module.monotonic()
+        try:
+            tasks = await asyncio.to_thread(self._read_tasks)
             
             # 过滤掉过期的任务
-            current_time = datetime.now()
-            self.tasks = {}
-            for msg_origin, tasks in tasks_data.items():
-                self.tasks[msg_origin] = []
-                for task in tasks:
-                    # 如果是一次性任务，需要判断是否过期
-                    if "datetime" in task:
-                        # 具体日期时间，如 "2025-03-30 16:30"
-                        schedule_time = datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M")
-                        if schedule_time > current_time:
-                            self.tasks[msg_origin].append(task)
-                        else:
-                            logger.info(f"任务 {task['id']} 已过期，从配置中移除")
-                            continue
-                    else:
-                        # 其他情况直接添加
-                        self.tasks[msg_origin].append(task)
-            logger.debug(f"加载任务配置(已过滤过期任务): {self.tasks}")
+            current_time = datetime.now().timestamp()
+            for i, task in enumerate(tasks, 1):
+                # 如果是一次性任务，需要判断是否过期，按补发策略不需要补发的才移除
+                if task.is_once and task.run_at <= current_time and not self._missed_runs(task, current_time):
+                    logger.info(f"任务 {task.id} 已过期，从配置中移除")
+                    self.store.record_remove(task.id, fired=True)
+                    continue
+                self._index_task(task)
+                if i % LOAD_BATCH_SIZE == 0:
+                    await asyncio.sleep(0)
+            logger.debug(f"加载任务配置(已过滤过期任务): 共{len(self.task_index)}个任务")
             
-            self._save_tasks(self.tasks)
-                
-        # 加载任务到调度器
-        self._load_tasks()
-        self.scheduler.start()
+            # 启动时把重放后的状态压缩成新快照
+            self._compact_tasks()
+            
+            # 加载任务到调度器
+            await self._load_tasks()
+            await self.retry_queue.load()
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"加载定时任务失败: {e}")
+            return
+        self._load_seconds = time_module.monotonic() - self._load_started
+        self.ready = True
+        logger.info(f"已加载{len(self.task_index)}个定时任务，用时{self._load_seconds:.2f}秒")
+        
+        if self.store.reloadable and self.config.get("reload_interval", 5) > 0:
+            # 等启动时的快照落盘，此时 tasks.json 包含所有任务，再开始监视
+            await asyncio.to_thread(self.store.flush)
+            self.task_watcher = FileWatcher(self.store.snapshot_path)
+    
+    def _read_tasks(self) -> list[Task]:
+        """读取存储中的所有任务（在后台线程中执行）"""
+        tasks_data = self.store.load()
+        return [Task.from_dict(msg_origin, data) for msg_origin, tasks in tasks_data.items() for data in tasks]
     
-    def _load_tasks(self):
-        """加载保存的定时任务"""            
-        for msg_origin, tasks in self.tasks.items():
-            for task in tasks:
-                self._schedule_task(msg_origin, task)
+    def _take_over(self):
+        """备用实例获得主实例锁后，加载原主实例保存的最新任务并开始调度"""
+        self.standby = False
+        self.scheduler.resume()
+        logger.info("备用实例已接管，开始加载任务")
+        self._loading = asyncio.create_task(self._restore_tasks())
     
-    def _save_tasks(self, tasks):
-        """保存任务配置到文件"""
-        # 先清除任务列表为空的对象
-        # tasks = {msg_origin: tasks for msg_origin, tasks in tasks.items() if tasks}
+    async def _load_tasks(self):
+        """加载保存的定时任务，并安排补发停机期间错过的触发"""
+        current_time = datetime.now().timestamp()
+        catchups = []
+        scheduled = []
+        for i, task in enumerate(list(self.task_index.values()), 1):
+            if i % LOAD_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+            missed = self._missed_runs(task, current_time)
+            catchups.extend((task, fire_time) for fire_time in missed)
+            # 过期的一次性任务只补发，不再调度
+            if not (task.is_once and task.run_at <= current_time):
+                scheduled.append(task)
+        # 分批加入调度器，每批之间让出事件循环
+        for start in range(0, len(scheduled), LOAD_BATCH_SIZE):
+            self._schedule_tasks(scheduled[start:start + LOAD_BATCH_SIZE])
+            await asyncio.sleep(0)
+        if catchups:
+            logger.info(f"{len(catchups)} 次错过的触发将在启动后补发")
+            self._schedule_catchups(catchups, self.catchup_delay)
+    
+    def _missed_runs(self, task: Task, now: float) -> list[datetime]:
+        """按任务的补发策略计算需要补发的触发时间
         
-        with open("data/timetask/tasks.json", "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
+        - skip: 不补发
+        - once: 错过多次也只补发一次，返回当前时间（视为已补到现在）
+        - all: 每次错过的触发都补发，最多 catchup_max_runs 次（保留最近的）
+        只考虑 catchup_max_age 秒以内错过的触发；没有上次执行时间的循环任务和间隔任务不补发。
+        """
+        policy = task.catchup or self.catchup_policy
+        if policy == "skip" or task.interval is not None:
+            return []
+        tz = self.scheduler.timezone
+        earliest = now - self.catchup_max_age
+        if task.is_once:
+            return [datetime.fromtimestamp(task.run_at, tz)] if earliest <= task.run_at <= now else []
+        if task.last_run is None:
+            return []
+        
+        trigger = cron_cache.trigger(task.cron)
+        now_dt = datetime.fromtimestamp(now, tz)
+        start = datetime.fromtimestamp(max(task.last_run, earliest) + 1, tz)
+        fire_time = trigger.get_next_fire_time(None, start)
+        if policy == "once":
+            return [now_dt] if fire_time is not None and fire_time <= now_dt else []
+        
+        missed = deque(maxlen=self.catchup_max_runs)
+        while fire_time is not None and fire_time <= now_dt:
+            missed.append(fire_time)
+            fire_time = trigger.get_next_fire_time(fire_time, fire_time + timedelta(seconds=1))
+        return list(missed)
+    
+    def _schedule_catchups(self, catchups: list[tuple[Task, datetime]], delay: float):
+        """按错过的时间顺序安排补发，依次错开 catchup_stagger 秒，避免重启后集中调用LLM和发送"""
+        start = datetime.now(self.scheduler.timezone) + timedelta(seconds=delay)
+        catchups.sort(key=lambda item: item[1])
+        for i, (task, fire_time) in enumerate(catchups):
+            self.scheduler.add_job(
+                self._catch_up,
+                trigger=DateTrigger(run_date=start + timedelta(seconds=i * self.catchup_stagger)),
+                args=[task, fire_time],
+                id=f"{task.id}#catchup{next(self._catchup_seq)}",
+                misfire_grace_time=None,
+            )
+    
+    async def _catch_up(self, task: Task, fire_time: datetime):
+        """补发一次错过的触发，任务在此之前已被删除时跳过"""
+        if self.task_index.get(task.id) is not task:
+            return
+        logger.info(f"补发任务 {task.id} 错过的触发 {format_timestamp(int(fire_time.timestamp()))}")
+        if not task.is_once:
+            self._record_run(task, fire_time)
+        await self._run_task(task)
+    
+    def _record_run(self, task: Task, fire_time: datetime):
+        """记录循环任务的上次执行时间，补发较早的触发时不会倒退"""
+        timestamp = int(fire_time.timestamp())
+        if task.last_run is not None and timestamp <= task.last_run:
+            return
+        task.last_run = timestamp
+        self.store.record_run(task.id, format_timestamp(timestamp))
+        self._compact_if_needed()
+    
+    def _index_task(self, task: Task):
+        """把任务加入内存中的分组和ID索引"""
+        self.tasks.setdefault(task.msg_origin, {})[task.id] = task
+        self.task_index[task.id] = task
+        self.owner_index.setdefault(task.owner, {})[task.id] = task
     
-    def _schedule_task(self, msg_origin, task):
+    def _unindex_task(self, task_id: str) -> Optional[Task]:
+        """从分组和ID索引中移除任务，返回被移除的任务，不存在时返回 None"""
+        task = self.task_index.pop(task_id, None)
+        if task is None:
+            return None
+        origin_tasks = self.tasks.get(task.msg_origin)
+        if origin_tasks is not None:
+            origin_tasks.pop(task_id, None)
+            if not origin_tasks:
+                del self.tasks[task.msg_origin]  # 如果没有任务了，删除这个渠道
+        owner_tasks = self.owner_index.get(task.owner)
+        if owner_tasks is not None:
+            owner_tasks.pop(task_id, None)
+            if not owner_tasks:
+                del self.owner_index[task.owner]
+        return task
+    
+    def _compact_tasks(self):
+        """把当前任务状态交给后台线程写成快照"""
+        if not self.store.compactable:
+            return
+        # 事件循环中只复制任务列表，to_dict 和编码在写入线程中进行
+        groups = [(msg_origin, list(tasks.values())) for msg_origin, tasks in self.tasks.items()]
+        self.store.compact(lambda: {msg_origin: [task.to_dict() for task in tasks] for msg_origin, tasks in groups})
+    
+    def _compact_if_needed(self):
+        """日志记录过多时压缩"""
+        if self.store.needs_compaction:
+            self._compact_tasks()
+    
+    @staticmethod
+    def _task_trigger(task: Task):
+        return cron_cache.trigger(task.cron) if task.cron is not None else \
+               DateTrigger(run_date=task.run_datetime)
+    
+    def _schedule_task(self, task: Task):
         """添加定时任务到调度器"""
-        trigger = CronTrigger.from_crontab(task["cron"]) if "cron" in task else \
-                 DateTrigger(run_date=datetime.strptime(task["datetime"], "%Y-%m-%d %H:%M"))
-                 
-        logger.debug(f"添加定时任务: msg_origin={msg_origin}, task={task}")
-        logger.debug(f"trigger={trigger}")
-                 
-        self.scheduler.add_job(
-            self._send_message,
-            trigger=trigger,
-            args=[msg_origin, task],
-            id=task["id"],
-            misfire_grace_time=60
-        )
-        logger.debug(f"添加定时任务: msg_origin={msg_origin}, task={task}")
+        # 不把 trigger 格式化进日志：启动时逐个任务 str(trigger) 的开销很大
+        logger.debug(f"添加定时任务: msg_origin={task.msg_origin}, task={task.id}")
+        
+        if task.interval is not None:
+            self.tick.add(task.id, task.interval, task.created_at)
+        else:
+            # 只有即将触发的任务才会真正加入 APScheduler
+            self.horizon.add(task.id, self._task_trigger(task), self._run_task, [task])
     
-    async def _send_message(self, msg_origin: str, task: dict):
-        """发送消息"""
+    def _schedule_tasks(self, tasks: list[Task]):
+        """批量添加定时任务到调度器，只唤醒一次调度器"""
+        self.horizon.add_many([
+            (task.id, self._task_trigger(task), self._run_task, [task]) for task in tasks if task.interval is None
+        ])
+        self.tick.add_many([(task.id, task.interval, task.created_at) for task in tasks if task.interval is not None])
+    
+    def _unschedule_task(self, task_id: str):
+        """从调度器中删除任务及其预生成任务"""
+        if not self.horizon.remove(task_id):
+            self.tick.remove(task_id)
+        self._drop_prefetch(task_id)
+    
+    def _next_fire_time(self, task: Task) -> Optional[datetime]:
+        return self.tick.next_fire_time(task.id) if task.interval is not None else self.horizon.next_fire_time(task.id)
+    
+    def _drop_prefetch(self, task_id: str):
+        """删除任务的预生成 job 和已生成的内容"""
+        try:
+            self.scheduler.remove_job(f"{task_id}#prefetch")
+        except JobLookupError:
+            pass
+        self.prefetch_cache.discard(task_id)
+    
+    async def _check_task_file(self):
+        """轮询 tasks.json，被外部修改时先校验，再只把变化的任务应用到调度器
         
-        content = task["content"]
-        # 如果需要使用GPT
-        if task["use_gpt"]:
-            providers = self.context.get_all_providers()
-            # 如果没有可用的Provider
-            if not providers:
-                logger.error("没有可用的Provider")
-                content = "Error: 没有可用的LLM服务"
+        读文件和等待日志落盘在线程中进行，校验和修改任务都在事件循环中。
+        """
+        if not self.ready or self.task_watcher is None:
+            return
+        content = await asyncio.to_thread(self.task_watcher.poll)
+        if content is None:
+            return
+        snapshot_digest = self.store.snapshot_digest
+        if self.store.digest(content) == snapshot_digest:
+            # 插件自己写入的快照
+            return
+        
+        # 修改后的快照还要重放之后的日志，先把待写的日志落盘；
+        # 读取期间任务又有变化（新的日志还没落盘）时重新读取，不会把刚创建的任务当成被删除
+        while True:
+            version = self.store.version
+            await asyncio.to_thread(self.store.flush)
+            if self.store.snapshot_digest != snapshot_digest:
+                logger.warning("tasks.json 的修改在应用前被自动压缩覆盖，请重新修改")
+                return
+            try:
+                data = await asyncio.to_thread(self.store.reload, content)
+                new_tasks, errors = parse_tasks(data, CATCHUP_POLICIES, OVERLAP_POLICIES)
+            except (ValueError, TypeError, KeyError) as e:
+                new_tasks, errors = {}, [f"无法解析: {e}"]
+            if self.store.version == version:
+                break
+        if errors:
+            await self._reject_task_file(content, errors)
+            return
+        
+        added, removed, changed = self._apply_task_file(new_tasks)
+        logger.info(f"tasks.json 已重新加载：新增{added}个，删除{removed}个，修改{changed}个任务")
+        # 按当前状态重写快照并清空日志，重启后加载到的也是修改后的任务
+        self._compact_tasks()
+    
+    def _apply_task_file(self, new_tasks: dict[str, Task]) -> tuple[int, int, int]:
+        """与当前任务比较，只删除、添加、修改有变化的任务，返回 (新增, 删除, 修改) 的数量"""
+        current_time = datetime.now().timestamp()
+        removed = [task_id for task_id in self.task_index if task_id not in new_tasks]
+        for task_id in removed:
+            self._unindex_task(task_id)
+            self._unschedule_task(task_id)
+            self.runs.cancel(task_id)
+            self.retry_queue.discard(task_id)
+            self.delivery_status.pop(task_id, None)
+            self.metrics.forget(task_id)
+        
+        added = changed = 0
+        to_schedule = []
+        for task_id, task in new_tasks.items():
+            old = self.task_index.get(task_id)
+            if old is None:
+                if task.is_once and task.run_at <= current_time:
+                    logger.warning(f"任务 {task_id} 的触发时间已过，不添加")
+                    continue
+                added += 1
+            elif old.msg_origin == task.msg_origin and old.to_dict() == task.to_dict():
+                continue
             else:
-                provider = providers[0]
-                response = await provider.text_chat(content)
-                if not response.completion_text:
-                    logger.error("无法获取回复", response.raw_completion)
-                    content = "Error: 无法获取回复"
-                else:
-                    content = response.completion_text or "Error: 回复为空"
-        
-        await self.context.send_message(msg_origin, MessageChain().message(content))
-
-        # 如果是一次性任务（使用datetime而不是cron），发送后删除
-        if "datetime" in task:
-            # 从tasks中删除该任务
-            if msg_origin in self.tasks:
-                self.tasks[msg_origin] = [t for t in self.tasks[msg_origin] if t["id"] != task["id"]]
-                
-            # 保存到文件
-            self._save_tasks(self.tasks)
-    
-    def _parse_datetime(self, date_str: str, time_str: str) -> tuple[Optional[str], Optional[str]]:
-        """解析日期时间字符串，返回(cron表达式, 人类可读描述)的元组"""
-        time_parts = time_str.split(":")
-        if len(time_parts) != 2:
-            return None, None
-        hour, minute = time_parts
-        
-        if not (hour.isdigit() and minute.isdigit()):
-            return None, None
-            
-        if not (0 <= int(hour) <= 23 and 0 <= int(minute) <= 59):
-            return None, None
-            
-        # 处理描述性日期
-        if date_str == "每天":
-            return f"{minute} {hour} * * *", f"每天{hour}:{minute}"
-        elif date_str == "工作日":
-            return f"{minute} {hour} * * 0-4", f"每个工作日{hour}:{minute}"
-        elif date_str.startswith("每周"):
-            weekday_map = {"一": "0", "二": "1", "三": "2", "四": "3", "五": "4", "六": "5", "日": "6", "天": "6"}
-            weekday_names = {"一": "一", "二": "二", "三": "三", "四": "四", "五": "五", "六": "六", "日": "日", "天": "日"}
-            weekday = date_str[2:]
-            if weekday not in weekday_map:
-                return None, None
-            return f"{minute} {hour} * * {weekday_map[weekday]}", f"每周{weekday_names[weekday]}{hour}:{minute}"
+                changed += 1
+                self._unindex_task(task_id)
+                if old.targets != task.targets:
+                    self.delivery_status.pop(task_id, None)
+                if (old.cron, old.run_at, old.interval, old.created_at) == \
+                        (task.cron, task.run_at, task.interval, task.created_at):
+                    # 触发时间不变，保留调度，只替换执行时使用的任务（间隔任务执行时按ID查找）；
+                    # 预生成的内容作废，到点实时生成
+                    self._index_task(task)
+                    self.horizon.modify(task_id, [task])
+                    self._drop_prefetch(task_id)
+                    continue
+                self._unschedule_task(task_id)
+            self._index_task(task)
+            to_schedule.append(task)
+        self._schedule_tasks(to_schedule)
+        return added, len(removed), changed
+    
+    async def _reject_task_file(self, content: bytes, errors: list[str]):
+        """修改后的 tasks.json 校验失败：不改动任何任务，保存一份出错的文件，再按当前任务恢复 tasks.json"""
+        rejected_path = f"{self.store.snapshot_path}.rejected"
+        
+        def write_rejected():
+            with open(rejected_path, "wb") as f:
+                f.write(content)
+        
+        await asyncio.to_thread(write_rejected)
+        details = "\n".join(errors[:10])
+        if len(errors) > 10:
+            details += f"\n... 共{len(errors)}个错误"
+        logger.error(f"tasks.json 校验失败，没有应用任何修改，已恢复为当前任务，出错的文件保存在 {rejected_path}:\n{details}")
+        self._compact_tasks()
+    
+    def _on_task_materialized(self, task_id: str, fire_time: datetime):
+        """任务进入调度窗口时，为GPT任务安排内容预生成"""
+        task = self.task_index.get(task_id)
+        if task and task.use_gpt:
+            self._schedule_prefetch(task, fire_time)
+    
+    def _on_task_fire(self, task_id: str, fire_time: datetime):
+        """任务开始执行时记录触发延迟"""
+        task = self.task_index.get(task_id)
+        if task:
+            lateness = datetime.now(fire_time.tzinfo) - fire_time
+            self.metrics.record_fire(task.id, task.platform, lateness.total_seconds() * 1000)
+            if not task.is_once:
+                self._record_run(task, fire_time)
+    
+    async def _dispatch_tick(self, task_ids: list[str], fire_time: datetime):
+        """执行同一秒到期的一批间隔任务"""
+        lateness = (datetime.now(fire_time.tzinfo) - fire_time).total_seconds() * 1000
+        tasks = []
+        for task_id in task_ids:
+            task = self.task_index.get(task_id)
+            if task is not None:
+                self.metrics.record_fire(task.id, task.platform, lateness)
+                tasks.append(task)
+        results = await asyncio.gather(*(self._run_task(task) for task in tasks), return_exceptions=True)
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception):
+                logger.error(f"间隔任务 {task.id} 执行出错: {result}")
+                self.metrics.record_failure(task.id, task.platform)
+    
+    def _on_job_event(self, event):
+        """统计任务 job 的执行出错和错过触发，预生成等内部 job 的 ID 带 #，不计入"""
+        if "#" in event.job_id:
+            return
+        task = self.task_index.get(event.job_id)
+        platform = task.platform if task else "unknown"
+        if event.code == EVENT_JOB_MISSED:
+            self.metrics.record_misfire(event.job_id, platform)
+            if task:
+                self._on_task_missed(task, event.scheduled_run_time)
         else:
-            # 处理具体日期
-            try:
-                if date_str in ["今天", "明天", "后天"]:
-                    today = datetime.now()
-                    days_to_add = {"今天": 0, "明天": 1, "后天": 2}[date_str]
-                    target_date = today.replace(hour=int(hour), minute=int(minute)) + timedelta(days=days_to_add)
-                else:
-                    target_date = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-                return target_date.strftime("%Y-%m-%d %H:%M"), target_date.strftime("%Y年%m月%d日 %H:%M")
-            except ValueError:
-                return None, None
-
-    def _parse_command(self, instruct: str) -> Optional[dict]:
-        """解析命令字符串，返回解析后的参数字典"""
-        # 移除前后空格
-        instruct = instruct.strip()
-        
-        # 初始化结果字典
-        result = {
-            "use_gpt": False,
-            "group_name": None,
-            "content": None,
-            "schedule": None,
-            "schedule_h": None  # 添加人类可读的时间描述
+            self.metrics.record_failure(event.job_id, platform)
+    
+    def _on_task_missed(self, task: Task, fire_time: datetime):
+        """运行期间错过宽限时间的触发（如事件循环长时间阻塞），按补发策略处理"""
+        if (task.catchup or self.catchup_policy) != "skip":
+            self._schedule_catchups([(task, fire_time)], 0)
+        elif task.is_once and self._unindex_task(task.id):
+            # 不补发的一次性任务不会再触发，直接移除
+            self.delivery_status.pop(task.id, None)
+            self.store.record_remove(task.id, fired=True)
+            self._compact_if_needed()
+    
+    def _metrics_gauges(self) -> dict[str, float]:
+        """其他组件的当前状态，导出时附加在统计之后"""
+        gauges = {
+            "timetask_ready": int(self.ready),
+            "timetask_load_seconds": self._load_seconds or 0,
+            "timetask_tasks": len(self.task_index),
+            "timetask_jobs_materialized": self.horizon.materialized_count,
+            "timetask_interval_tasks": len(self.tick),
+            "timetask_ticks": self.tick.ticks,
+            "timetask_tick_dispatched": self.tick.dispatched,
+            "timetask_llm_waiting": self.llm.waiting,
+            "timetask_llm_running": self.llm.running,
+            "timetask_llm_coalesced": self.llm.coalesced,
+            "timetask_llm_timeout": self.llm.timeouts,
+            "timetask_retry_queue": len(self.retry_queue),
+            "timetask_retry_given_up": self.retry_queue.given_up,
+            "timetask_runs_in_flight": len(self.runs),
+            "timetask_runs_skipped": self.runs.skipped,
+            "timetask_runs_cancelled": self.runs.cancelled,
+            "timetask_runs_replaced": self.runs.replaced,
         }
+        for platform, stats in self.sender.stats().items():
+            for key, value in stats.items():
+                gauges[f'timetask_send_queue_{key}{{platform="{platform}"}}'] = value
+        return gauges
+    
+    async def _export_metrics(self):
+        """在后台线程写入 Prometheus 文本文件"""
+        try:
+            await asyncio.to_thread(self.metrics.write_prometheus, self.metrics_path, self._metrics_gauges())
+        except OSError as e:
+            logger.warning(f"写入统计文件失败: {e}")
+    
+    def _schedule_prefetch(self, task: Task, fire_time: datetime):
+        """在下次触发前 prefetch_lead 秒安排一次GPT内容预生成"""
+        if self.prefetch_lead <= 0:
+            return
         
-        # 解析群名（如果存在）
-        if "group[" in instruct:
-            try:
-                group_start = instruct.rindex("group[")
-                group_end = instruct.rindex("]")
-                if group_start < group_end:
-                    result["group_name"] = instruct[group_start+6:group_end]
-                    instruct = instruct[:group_start].strip()
-            except ValueError:
-                return None
+        lead = self.prefetch_lead + task_jitter(task.id, self.llm_jitter)
+        run_date = max(fire_time - timedelta(seconds=lead), datetime.now(fire_time.tzinfo))
+        self.scheduler.add_job(
+            self._prefetch,
+            trigger=DateTrigger(run_date=run_date),
+            args=[task, fire_time],
+            id=f"{task.id}#prefetch",
+            replace_existing=True,
+            misfire_grace_time=self.prefetch_lead
+        )
+    
+    async def _prefetch(self, task: Task, fire_time: datetime):
+        """提前生成GPT内容，失败或超时时到点再实时生成
         
-        # 检查是否使用GPT
-        parts = instruct.split(" ")
-        logger.debug(f"解析前的指令：{instruct}")
-        logger.debug(f"解析后的指令：{parts}")
-        if "GPT" in parts:
-            result["use_gpt"] = True
-            parts.remove("GPT")
-            instruct = " ".join(parts)
-        
-        # 解析cron表达式
-        if instruct.startswith("cron[") and "]" in instruct:
-            cron_end = instruct.index("]")
-            cron_expr = instruct[5:cron_end]
-            try:
-                # 验证cron表达式
-                CronTrigger.from_crontab(cron_expr)
-                result["schedule"] = cron_expr
-                result["schedule_h"] = instruct[5:cron_end]  # 保存原始表达式作为描述
-                result["content"] = instruct[cron_end+1:].strip()
-                return result
-            except Exception:
+        与运行使用相同的LLM超时，卡住的 Provider 不会一直占用LLM并发名额。
+        """
+        content = await self._generate_content(task)
+        if content:
+            self.prefetch_cache.put(task.id, fire_time, content)
+            logger.debug(f"任务 {task.id} 已预生成内容，触发时间 {fire_time}")
+    
+    async def _generate_content(self, task: Task) -> Optional[str]:
+        """调用LLM生成内容，失败返回 None"""
+        providers = self.context.get_all_providers()
+        # 如果没有可用的Provider
+        if not providers:
+            logger.error("没有可用的Provider")
+            self.metrics.record_failure(task.id, task.platform)
+            return None
+        provider = providers[0]
+        timeout = self.run_timeout if task.timeout is None else task.timeout
+        started = time_module.monotonic()
+        try:
+            response = await self.llm.text_chat(provider, task.content, timeout)
+            self.metrics.record_llm(task.id, task.platform, (time_module.monotonic() - started) * 1000)
+            # Provider 可能返回 None 或没有文本的回复
+            if not response.completion_text:
+                logger.error(f"无法获取回复: {response.raw_completion}")
+                self.metrics.record_failure(task.id, task.platform)
                 return None
-        
-        # 解析日期时间格式
-        parts = instruct.split(" ",maxsplit=2)
-        if len(parts) < 3:
+            return response.completion_text
+        except Exception as e:
+            logger.error(f"任务 {task.id} 调用LLM失败: {e}")
+            self.metrics.record_failure(task.id, task.platform)
             return None
+    
+    async def _send_message(self, task: Task):
+        """发送消息"""
+        
+        content = task.content
+        # 如果需要使用GPT
+        if task.use_gpt:
+            # 优先使用预生成的内容
+            content = self.prefetch_cache.take(task.id, datetime.now(self.scheduler.timezone))
+            if content is None:
+                # 实时生成时按任务错开调用时间，避免同一时刻集中请求
+                jitter = task_jitter(task.id, self.llm_jitter)
+                if jitter and self.context.get_all_providers():
+                    await asyncio.sleep(jitter)
+                content = await self._generate_content(task)
+        
+        targets = list(task.targets or [task.msg_origin])
+        # 生成失败时不把错误提示发到聊天中，整体交给重试队列
+        failed = targets if content is None else await self._deliver_all(task, targets, content)
+        if failed:
+            self.retry_queue.add(task, failed, content)
+    
+    async def _run_task(self, task: Task):
+        """执行一次任务，上一次运行还没结束时按重叠策略处理
+        
+        LLM调用超时、发送超时都按失败进入重试队列，一次性任务删除后仍会重试。
+        """
+        outcome = None
+        try:
+            outcome = await self.runs.run(task.id, lambda: self._send_message(task), task.overlap)
+        finally:
+            # 如果是一次性任务（使用datetime而不是cron），运行结束（包括被取消、出错）后删除，
+            # 重启后不会再次补发；跳过的触发说明同一任务正在运行，由那次运行删除
+            if task.is_once and outcome != SKIPPED:
+                # 从tasks中删除该任务
+                self.delivery_status.pop(task.id, None)
+                if self._unindex_task(task.id):
+                    # 追加到日志
+                    self.store.record_remove(task.id, fired=True)
+                    self._compact_if_needed()
+    
+    async def _deliver_all(self, task: Task, targets: list[str], content: str) -> list[str]:
+        """内容只生成一次，分发到所有目标，记录每个目标的发送结果，返回发送失败的目标"""
+        results = await asyncio.gather(
+            *(self._deliver(task, target, content) for target in targets),
+            return_exceptions=True
+        )
+        sent_at = datetime.now().strftime("%m-%d %H:%M")
+        status = self.delivery_status.setdefault(task.id, {})
+        failed = []
+        for target, result in zip(targets, results):
+            if isinstance(result, BaseException):
+                logger.error(f"任务 {task.id} 发送到 {target} 失败: {result}")
+                status[target] = f"失败 {sent_at}"
+                self.metrics.record_failure(task.id, task.platform)
+                failed.append(target)
+            else:
+                status[target] = f"成功 {sent_at}"
+        return failed
+    
+    async def _retry_delivery(self, entry: RetryEntry) -> bool:
+        """重试一次失败的运行：需要时重新生成内容，再发送到还没有成功的目标，全部成功返回 True"""
+        task = entry.task
+        if entry.content is None:
+            entry.content = await self._generate_content(task)
+            if entry.content is None:
+                return False
+        entry.targets = await self._deliver_all(task, entry.targets, entry.content)
+        if task.is_once:
+            # 一次性任务已经从任务列表中删除，不保留发送结果
+            self.delivery_status.pop(task.id, None)
+        return not entry.targets
+    
+    async def _deliver(self, task: Task, target: str, content: str):
+        """发送到一个目标，记录从排队到发送完成的耗时"""
+        started = time_module.monotonic()
+        await self.sender.send(target, MessageChain().message(content))
+        self.metrics.record_send(task.id, task.platform, (time_module.monotonic() - started) * 1000)
+    
+    async def _build_task(
+        self, parsed: dict, event: AstrMessageEvent, reserved_ids: Collection[str] = ()
+    ) -> tuple[Optional[Task], Optional[str]]:
+        """按解析好的命令创建任务（不保存、不调度），返回 (任务, 错误信息)
+        reserved_ids 是批量创建时已分配但尚未保存的任务ID
+        """
+        if parsed["interval"] is not None and parsed["interval"] < self.min_interval:
+            return None, f"间隔不能小于{self.min_interval}秒"
+        
+        # 获取平台
+        platform_name = event.get_platform_name()        
+        
+        # 发送目标，默认发回当前会话
+        targets = parsed["origins"] or [event.unified_msg_origin]
+        if parsed["group_names"]:
             
-        date_str, time_str, content = parts
-        schedule, schedule_h = self._parse_datetime(date_str, time_str)
-        if not schedule:
-            return None
+            # 判断平台类型，非wechatpadpro提示不支持
+            if platform_name != "wechatpadpro":
+                return None, "暂时只有wechatpadpro支持群任务"
+            
+            # 获取平台和客户端
+            platform : "WeChatPadProAdapter" = self.context.get_platform(platform_name)
+            
+            # 判断get_contact_list是否支持
+            if not hasattr(platform, "get_contact_list") or not hasattr(platform, "get_contact_details_list"):
+                return None, "请升级到最新版AstrBot以支持群任务"
+            
+            # 从联系人缓存中查找群ID
+            targets = []
+            not_found = []
+            for group_name in parsed["group_names"]:
+                try:
+                    group_id = await self.contacts.resolve(platform_name, platform, group_name)
+                except ContactDirectoryError as e:
+                    logger.warning(str(e))
+                    return None, f"未找到名为 {group_name} 的群({e})"
+                if not group_id:
+                    not_found.append(group_name)
+                    continue
+                targets.append(f"{platform_name}:{MessageType.GROUP_MESSAGE.value}:{group_id}")
             
-        result["schedule"] = schedule
-        result["schedule_h"] = schedule_h
-        result["content"] = content
-        return result
+            if not_found:
+                return None, f"未找到名为 {', '.join(not_found)} 的群"
+            targets = list(dict.fromkeys(targets))
+        
+        # 发到当前会话以外的目标需要管理员权限，否则任何人都能让机器人向任意会话发消息
+        if any(target != event.unified_msg_origin for target in targets) and not event.is_admin():
+            return None, "只有管理员可以用 group[...] 或 origin[...] 向其他会话发送消息"
+            
+        # 创建任务：保存在第一个目标下；有多个目标时只调度一次、生成一次内容，再分发到所有目标
+        task_id = self.id_allocator.allocate()
+        while task_id in reserved_ids:
+            task_id = self.id_allocator.allocate()
+        task = Task(
+            id=task_id,
+            msg_origin=targets[0],
+            content=parsed["content"],
+            use_gpt=parsed["use_gpt"],
+            group_name=parsed["group_name"],
+            targets=targets if len(targets) > 1 else None,
+            cron=parsed["cron"],
+            run_at=parsed["run_at"],
+            interval=parsed["interval"],
+            catchup=parsed["catchup"],
+            timeout=parsed["timeout"],
+            overlap=parsed["overlap"],
+            creator=event.unified_msg_origin,
+        )
+        # 新建的循环任务从创建时起计算错过的触发
+        if task.cron is not None:
+            task.last_run = task.created_at
+        return task, None
 
     @filter.command_group("time")
     def time(self):
@@ -236,14 +837,24 @@ class MyPlugin(Star):
     async def time_main(self, event: AstrMessageEvent):
         """定时发送消息到群聊
         用法语法解释：<> 表示必须填，() 表示可选
-        用法1: /time <日期 时间> (GPT) <内容> (group[群名])
-        用法2: /time cron[<表达式>] (GPT) <内容> (group[群名])
+        用法1: /time <日期 时间> (GPT) <内容> (group[群名1,群名2,...])
+        用法2: /time cron[<表达式>] (GPT) <内容> (group[群名1,群名2,...])
+        也可以用 origin[<消息来源1>,<消息来源2>,...] 直接指定发送目标；发到当前会话以外的目标仅管理员可用
+        用 catchup[skip|once|all] 指定错过触发（如机器人停机期间）时的补发策略：
+        不补发、只补发一次、每次都补发，默认使用配置中的策略
+        用 timeout[秒数] 限制每次GPT生成的时间，overlap[skip|queue|replace] 指定上一次运行还没结束时
+        跳过、排队还是取消上一次，默认使用配置中的设置
         时间格式：
         - 日期时间
-            - 具体日期: "2023-12-31"
+            - 具体日期: "2023-12-31"、"今天"、"明天"、"后天"
             - 每天: "每天"
+            - 工作日: "工作日"
             - 每周几: "每周一"、"每周二"、"每周三"、"每周四"、"每周五"、"每周六"、"每周日"
+            - 每月几号: "每月1号"、"每月15号"
         - 时间: "10:30"
+        - 相对时间: "30分钟后"、"2小时后"、"3天后"（一次性任务）
+        - 间隔: "每30秒"、"每30分钟"、"每2小时"，从创建时起计时；
+          加上日期和时间范围（不含结束时间）时按整点对齐: "工作日 09:00-18:00 每30分钟"
         - cron表达式: "0 * * * *"
             - 分钟 (0-59)
             - 小时 (0-23)
@@ -258,7 +869,9 @@ class MyPlugin(Star):
 
         - 每天早上让AI用猫娘的语气问候：/time 每天 10:30 GPT 现在是10:30，用猫娘的语气对我说早上好
 
-        - 每天早上向群里发送消息：/time 每天 10:30 滴滴滴 group[群名]健身
+        - 每天早上向群里发送消息：/time 每天 10:30 滴滴滴 group[健身群]
+
+        - 同一条GPT消息发到多个群：/time 每天 08:00 GPT 说早安 group[工作群,亲友群]
 
         - 准点报时：/time cron[0 * * * *] 滴滴滴~~
 
@@ -269,185 +882,60 @@ class MyPlugin(Star):
         
         # 过滤其他命令，例如 time rm, time ls, time help
         COMMAND = "time"
-        SUB_COMMANDS = ["rm", "ls", "help"]
+        SUB_COMMANDS = ["rm", "cancel", "ls", "next", "help", "stats", "import", "export"]
         if any(message_str.startswith(f"{COMMAND} {sub_command}") for sub_command in SUB_COMMANDS):
             return
         
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        
         # 解析命令
         instruct = message_str[len(COMMAND):].strip()
-        parsed = self._parse_command(instruct)
-        
-        # 验证命令
-        if not parsed:
-            yield event.plain_result("命令格式错误，请检查语法")
+        try:
+            parsed = parse_command(instruct)
+        except ParseError as e:
+            yield event.plain_result(f"命令格式错误，{e}")
             return
-            
-        if not parsed["content"]:
-            yield event.plain_result("消息内容不能为空")
+        task, error = await self._build_task(parsed, event)
+        if error:
+            yield event.plain_result(error)
             return
-
-        # 获取平台
-        platform_name = event.get_platform_name()        
-        
-        group_id = None
-        if parsed["group_name"]:
-            
-            # 判断平台类型，非wechatpadpro提示不支持
-            if platform_name != "wechatpadpro":
-                yield event.plain_result("暂时只有wechatpadpro支持群任务")
-                return
-            
-            # 获取平台和客户端
-            platform : WeChatPadProAdapter = self.context.get_platform(platform_name)
-            
-            # 判断get_contact_list是否支持
-            if not hasattr(platform, "get_contact_list") or not hasattr(platform, "get_contact_details_list"):
-                yield event.plain_result("请升级到最新版AstrBot以支持群任务")
-                return
-            
-            
-            # 获取联系人id列表
-            contact_ids = await platform.get_contact_list()
-            
-            if not contact_ids:
-                logger.warning("获取联系人id列表失败")
-                yield event.plain_result(f"未找到名为 {parsed['group_name']} 的群(获取联系人id列表为空)")
-                return
-            
-            contact_details = await platform.get_contact_details_list([], contact_ids)
-            
-            if not contact_details:
-                logger.warning("获取联系人信息失败")
-                yield event.plain_result(f"未找到名为 {parsed['group_name']} 的群(获取联系人信息为空)")
-                return
-            
-            for contact in contact_details:
-                contact_name = contact.get("nickName", {}).get('str', '')
-                if contact_name == parsed["group_name"]:
-                    group_id = contact.get("userName", {}).get('str', '')
-                    break
-            
-            if not group_id:
-                yield event.plain_result(f"未找到名为 {parsed['group_name']} 的群")
-                return
-            
-            
-        # 生成任务ID
-        while True:
-            task_id = "".join(random.choices(string.digits, k=4))
-            if not any(task["id"] == task_id for tasks in self.tasks.values() for task in tasks):
-                break
-
-        # 创建任务配置
-        task = {
-            "id": task_id,
-            "content": parsed["content"],
-            "use_gpt": parsed["use_gpt"],
-            "group_name": parsed["group_name"],
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        # 根据schedule类型设置触发器
-        if isinstance(parsed["schedule"], str) and ":" in parsed["schedule"]:
-            # 具体日期时间，如 "2025-03-30 16:30"
-            schedule_time = datetime.strptime(parsed["schedule"], "%Y-%m-%d %H:%M")
-            current_time = datetime.now()
-            if schedule_time < current_time:
-                yield event.plain_result(f"设置的时间 {parsed['schedule']} 早于当前时间，请设置未来的时间")
-                return
-            
-            task["datetime"] = parsed["schedule"]
-            task["datetime_h"] = parsed["schedule_h"]
-        else:
-            # cron表达式
-            task["cron"] = parsed["schedule"]
-            task["cron_h"] = self.humanize_cron(parsed["schedule"])
-            
-        # 使用event的统一消息来源，如果指定了群，则使用群消息来源
-        msg_origin = event.unified_msg_origin
-        if parsed["group_name"]:
-            msg_origin = f"{platform_name}:{MessageType.GROUP_MESSAGE.value}:{group_id}"
          
         # 保存任务
-        if msg_origin not in self.tasks:
-            self.tasks[msg_origin] = []
-        self.tasks[msg_origin].append(task)
-        self._save_tasks(self.tasks)
+        self._index_task(task)
+        self.store.record_add(task.msg_origin, task.to_dict())
+        self._compact_if_needed()
         
-        logger.debug(f"新任务: msg_origin={msg_origin}, task={task}")
+        logger.debug(f"新任务: msg_origin={task.msg_origin}, task={task.to_dict()}")
         
         # 添加到调度器
-        self._schedule_task(msg_origin, task)
+        self._schedule_task(task)
         
         # 返回成功消息
-        schedule_type = "cron表达式" if "cron" in task else "具体时间"
-        schedule_value = task.get("cron", task.get("datetime"))
-        schedule_h = task.get("cron_h", task.get("datetime"))
+        schedule_type = "cron表达式" if task.cron is not None else "间隔" if task.interval is not None else "具体时间"
+        schedule_value = task.schedule_value
+        schedule_h = task.description
         response = f"定时任务创建成功！\n" \
-                  f"任务ID: {task_id}\n" \
+                  f"任务ID: {task.id}\n" \
                   f"触发方式: {schedule_type}\n" \
                   f"触发值: {schedule_value}\n" \
                   f"触发描述: {schedule_h}\n" \
                   f"使用GPT: {'是' if parsed['use_gpt'] else '否'}\n"
         if parsed["group_name"]:
             response += f"目标群组: {parsed['group_name']}\n"
+        elif parsed["origins"]:
+            response += f"发送目标: {', '.join(parsed['origins'])}\n"
+        if parsed["catchup"]:
+            response += f"错过补发: {parsed['catchup']}\n"
+        if parsed["timeout"] is not None:
+            response += f"生成超时: {parsed['timeout'] or '不限制'}{'秒' if parsed['timeout'] else ''}\n"
+        if parsed["overlap"]:
+            response += f"重叠策略: {parsed['overlap']}\n"
         response += f"消息内容: {parsed['content']}"
         
         yield event.plain_result(response)
     
-    def humanize_cron(self, cron_str: str):
-        """
-        使用 cron_descriptor 将 cron 表达式转换为人类可读的格式，如果转换失败则返回原始 cron 表达式
-        """
-        try:
-            from cron_descriptor import ExpressionDescriptor, Options, CasingTypeEnum
-            # 创建选项对象
-            options = Options()
-            options.locale_code = 'zh_CN'  # 设置语言为中文
-            options.use_24hour_time_format = True  # 使用24小时制
-            options.casing_type = CasingTypeEnum.Sentence  # 使用句子格式
-            
-            # 创建描述器并获取描述
-            descriptor = ExpressionDescriptor(cron_str, options)
-            desc = descriptor.get_description()
-            
-            # 替换英文星期、月份为中文
-            # 特别注意，APScheduler 的 cron 格式是差一天的，所以需要特殊处理
-            weekday_map = {
-                "Sunday": "周一",
-                "Monday": "周二",
-                "Tuesday": "周三",
-                "Wednesday": "周四",
-                "Thursday": "周五",
-                "Friday": "周六",
-                "Saturday": "周日"
-            }
-            
-            month_map = {
-                "January": "一月",
-                "February": "二月",
-                "March": "三月",
-                "April": "四月",
-                "May": "五月",
-                "June": "六月",
-                "July": "七月",
-                "August": "八月",
-                "September": "九月",
-                "October": "十月",
-                "November": "十一月",
-                "December": "十二月"
-            }
-            
-            for en, zh in weekday_map.items():
-                desc = desc.replace(en, zh)
-            
-            for en, zh in month_map.items():
-                desc = desc.replace(en, zh)
-                
-            return f"循环<{desc}>"
-        except Exception:
-            return f"cron[{cron_str}]"
-    
     # 有用的信息记录：    
     # 发送消息方式1：
     # await client.post_text(group_id, 'test')
@@ -560,34 +1048,157 @@ class MyPlugin(Star):
     #     return None
     
     async def terminate(self):
-        """停止调度器"""
+        """停止调度器，并写入所有未落盘的任务数据"""
+        if self._loading is not None and not self._loading.done():
+            self._loading.cancel()
+            await asyncio.gather(self._loading, return_exceptions=True)
         self.scheduler.shutdown()
-        pass
+        await self.tick.close()
+        await self.runs.close()
+        # 没有加载完时重试队列也没有加载，不能用空队列覆盖 retry.json
+        if self.ready:
+            await self.retry_queue.close()
+        await self.sender.close()
+        if self.config.get("metrics_export_interval", 0) > 0:
+            await self._export_metrics()
+        if self.ready:
+            # 停止时把日志压缩进快照，停机期间 tasks.json 就是最新的任务
+            self._compact_tasks()
+        self.store.close()
+        if self.leader_lock:
+            self.leader_lock.release()
 
     @time.command("ls")
     async def list_tasks(self, event: AstrMessageEvent):
-        """列出所有定时任务"""
-        tasks_list = []
-        for msg_origin, tasks in self.tasks.items():
-            tasks_list.extend(tasks)
-            
-        if not tasks_list:
+        """列出当前会话的定时任务
+        用法: /time ls [all] [cron|once|gpt] [页码]
+        - all: 列出所有会话的任务，仅管理员可用
+        - cron / once / gpt: 只列出循环任务 / 一次性任务 / 使用GPT的任务
+        示例:
+        - /time ls 2  # 第2页
+        - /time ls all gpt  # 所有会话中使用GPT的任务
+        """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        args = event.get_message_str().split()[2:]
+        show_all = False
+        filter_name = None
+        page = 1
+        for arg in args:
+            if arg == "all":
+                show_all = True
+            elif arg in LS_FILTERS:
+                filter_name = arg
+            elif arg.isdigit() and int(arg) > 0:
+                page = int(arg)
+            else:
+                yield event.plain_result("参数错误，格式：/time ls [all] [cron|once|gpt] [页码]")
+                return
+        
+        if show_all and not event.is_admin():
+            yield event.plain_result("只有管理员可以查看所有会话的任务")
+            return
+        
+        # 只遍历需要的任务，并且只格式化当前页
+        tasks = self.task_index.values() if show_all else \
+            self.owner_index.get(event.unified_msg_origin, {}).values()
+        if filter_name:
+            task_filter = LS_FILTERS[filter_name]
+            tasks = [task for task in tasks if task_filter(task)]
+        total = len(tasks)
+        if not total:
             yield event.plain_result("当前没有定时任务")
             return
-            
-        response = "当前的定时任务：\n"
-        for task in tasks_list:
-            # schedule_type = "cron表达式" if "cron" in task else "具体时间"
-            schedule_h = task.get("cron_h", task.get("datetime"))            
-            response += f"[{task['id']}] {schedule_h}"
-            if task.get('use_gpt'):
-                response += " GPT：" 
-            response += f" {task.get('content')}"
-            if task.get('group_name'):  
-                response += f" 发到群<{task['group_name']}>"
-            response += "\n"
+        
+        page_size = max(1, self.config.get("ls_page_size", 20))
+        pages = (total + page_size - 1) // page_size
+        if page > pages:
+            yield event.plain_result(f"没有第{page}页，共{pages}页")
+            return
+        
+        scope = "所有会话" if show_all else "当前会话"
+        response = f"{scope}的定时任务（共{total}个"
+        response += f"，第{page}/{pages}页）：\n" if pages > 1 else "）：\n"
+        for task in itertools.islice(tasks, (page - 1) * page_size, page * page_size):
+            response += self._format_task(task)
+        if page < pages:
+            next_args = (["all"] if show_all else []) + ([filter_name] if filter_name else []) + [str(page + 1)]
+            response += f"发送 /time ls {' '.join(next_args)} 查看下一页"
             
         yield event.plain_result(response.rstrip())
+    
+    def _format_task(self, task: Task) -> str:
+        """一个任务在 /time ls 中的显示"""
+        response = f"[{task.id}] {task.description}"
+        if not task.is_once:
+            fire_time = self._next_fire_time(task)
+            if fire_time is not None:
+                time_format = '%m-%d %H:%M:%S' if task.interval is not None and task.interval % 60 else '%m-%d %H:%M'
+                response += f"（下次 {fire_time.astimezone().strftime(time_format)}）"
+        if task.use_gpt:
+            response += " GPT："
+        response += f" {task.content}"
+        if task.group_name:
+            response += f" 发到群<{task.group_name}>"
+        response += "\n"
+        # 多目标任务显示每个目标最近一次的发送结果
+        targets = task.targets
+        if targets:
+            names = task.group_name.split(",") if task.group_name else targets
+            status = self.delivery_status.get(task.id, {})
+            for name, target in zip(names, targets):
+                response += f"  - {name}: {status.get(target, '未发送')}\n"
+        return response
+
+    @time.command("next")
+    async def next_tasks(self, event: AstrMessageEvent):
+        """按触发时间顺序列出即将执行的任务
+        用法: /time next [条数] [all]
+        - all: 包括所有会话的任务，仅管理员可用
+        示例: /time next 5
+        """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        args = event.get_message_str().split()[2:]
+        show_all = False
+        limit = 10
+        for arg in args:
+            if arg == "all":
+                show_all = True
+            elif arg.isdigit() and int(arg) > 0:
+                limit = min(int(arg), NEXT_MAX_LIMIT)
+            else:
+                yield event.plain_result("参数错误，格式：/time next [条数] [all]")
+                return
+        
+        if show_all and not event.is_admin():
+            yield event.plain_result("只有管理员可以查看所有会话的任务")
+            return
+        
+        if show_all:
+            # 所有任务的触发时间索引，按顺序只取前 limit 个
+            upcoming = list(itertools.islice(heapq.merge(self.horizon.upcoming(limit), self.tick.upcoming(limit)), limit))
+        else:
+            # 当前会话只在自己的任务中取最早的 limit 个，不遍历其他会话
+            owner_tasks = self.owner_index.get(event.unified_msg_origin, {})
+            upcoming = heapq.nsmallest(limit, (
+                (fire_time, task.id) for task in owner_tasks.values()
+                if (fire_time := self._next_fire_time(task)) is not None
+            ))
+        lines = []
+        for fire_time, task_id in upcoming:
+            task = self.task_index[task_id]
+            line = f"{fire_time.astimezone().strftime('%m-%d %H:%M:%S')} [{task.id}]"
+            if task.use_gpt:
+                line += " GPT："
+            lines.append(f"{line} {task.content}")
+        
+        if not lines:
+            yield event.plain_result("没有即将执行的任务")
+            return
+        yield event.plain_result(f"即将执行的{len(lines)}个任务：\n" + "\n".join(lines))
 
     @time.command("rm")
     async def remove_task(self, event: AstrMessageEvent):
@@ -597,6 +1208,9 @@ class MyPlugin(Star):
         - /time rm 1234  # 删除单个任务
         - /time rm 1234 5678  # 删除多个任务
         """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
         user_msg = event.get_message_str()
         ids_to_remove = user_msg.split()[2:]
         logger.debug(f"user_msg: {user_msg}")
@@ -612,37 +1226,27 @@ class MyPlugin(Star):
         
         # 删除每个任务
         for task_id in ids_to_remove:
-            # 查找要删除的任务
-            target_origin = None
-            target_task = None
-            for msg_origin, tasks in self.tasks.items():
-                for task in tasks:
-                    if task["id"] == task_id:
-                        target_origin = msg_origin
-                        target_task = task
-                        break
-                if target_origin:
-                    break
-                    
-            if not target_origin:
+            # 删除任务
+            if not self._unindex_task(task_id):
                 not_found_ids.append(task_id)
                 continue
                 
-            # 删除任务
-            self.tasks[target_origin].remove(target_task)
-            if not self.tasks[target_origin]:
-                del self.tasks[target_origin]  # 如果没有任务了，删除这个渠道
-                
-            # 也从scheduler中删除
-            self.scheduler.remove_job(task_id)
+            # 也从scheduler中删除，正在进行的运行一起取消
+            self._unschedule_task(task_id)
+            self.runs.cancel(task_id)
+            self.retry_queue.discard(task_id)
+            self.delivery_status.pop(task_id, None)
+            self.metrics.forget(task_id)
+            
+            # 追加到日志
+            self.store.record_remove(task_id)
             
             removed_ids.append(task_id)
         
-        # 保存更新后的任务
         if removed_ids:
-            self._save_tasks(self.tasks)
+            self._compact_if_needed()
             logger.debug(f"删除任务: {removed_ids}")
-            logger.debug(f"当前任务配置: {self.tasks}")
+            logger.debug(f"当前任务数: {len(self.task_index)}")
         
         # 返回成功消息
         response = []
@@ -653,13 +1257,214 @@ class MyPlugin(Star):
             
         yield event.plain_result("\n".join(response))
 
+    @time.command("cancel")
+    async def cancel_run(self, event: AstrMessageEvent):
+        """取消任务正在进行的运行（如卡住的GPT生成），任务本身保留，之后照常触发
+        用法: /time cancel <任务ID1> [任务ID2 ...]
+        """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        task_ids = event.get_message_str().split()[2:]
+        if not task_ids:
+            yield event.plain_result("请提供任务ID，格式：/time cancel <任务ID1> [任务ID2 ...]")
+            return
+        
+        cancelled = [task_id for task_id in task_ids if self.runs.cancel(task_id)]
+        idle = [task_id for task_id in task_ids if task_id not in cancelled]
+        response = []
+        if cancelled:
+            response.append(f"已取消运行：{', '.join(cancelled)}")
+        if idle:
+            response.append(f"没有正在运行：{', '.join(idle)}")
+        yield event.plain_result("\n".join(response))
+
+    @time.command("stats")
+    async def show_stats(self, event: AstrMessageEvent):
+        """查看任务执行统计
+        用法: /time stats [任务ID]
+        不带任务ID时显示按平台的统计和发送队列、LLM调用的状态
+        """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        args = event.get_message_str().split()[2:]
+        if args:
+            task_id = args[0]
+            stats = self.metrics.task_stats(task_id)
+            if stats is None:
+                yield event.plain_result(f"任务 {task_id} 暂无执行统计")
+                return
+            yield event.plain_result(Metrics.format_stats(f"任务 {task_id}", stats))
+            return
+        
+        response = [
+            f"任务总数: {len(self.task_index)}（启动加载用时{self._load_seconds:.2f}秒），"
+            f"调度窗口内: {self.horizon.materialized_count}，"
+            f"间隔任务: {len(self.tick)}，已分发{self.tick.dispatched}次（{self.tick.ticks}批）",
+            f"LLM调用: 排队{self.llm.waiting} 进行中{self.llm.running} 已合并{self.llm.coalesced} 超时{self.llm.timeouts}",
+            f"重试队列: 待重试{len(self.retry_queue)}个任务 已放弃{self.retry_queue.given_up}次",
+            f"运行: 进行中{len(self.runs)} 跳过{self.runs.skipped} "
+            f"取消{self.runs.cancelled} 替换{self.runs.replaced}",
+        ]
+        for platform, stats in self.metrics.platforms.items():
+            response.append(Metrics.format_stats(platform, stats))
+        for platform, stats in self.sender.stats().items():
+            response.append(
+                f"{platform} 发送队列: 当前{stats['depth']} 最大{stats['max_depth']} "
+                f"成功{stats['sent']} 失败{stats['failed']} 队列满等待{stats['blocked']}次"
+            )
+        yield event.plain_result("\n".join(response))
+
+    @time.command("import")
+    async def import_tasks(self, event: AstrMessageEvent):
+        """批量导入定时任务
+        用法: /time import 后换行，每行一个任务，格式与 /time 命令相同（可以省略开头的 /time），
+        也可以附带一个这样的文本文件。空行和以 # 开头的行会被忽略。
+        所有行都校验通过后才导入，有任何一行出错时不导入任何任务。
+        示例:
+        /time import
+        每天 08:00 早上好
+        每周五 17:30 GPT 周末祝福 group[亲友群]
+        """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        lines = await self._read_import_lines(event)
+        if not lines:
+            yield event.plain_result("请在 /time import 后换行写入任务（每行一个），或附带任务文件")
+            return
+        max_lines = self.config.get("import_max_lines", 1000)
+        if len(lines) > max_lines:
+            yield event.plain_result(f"一次最多导入 {max_lines} 个任务，当前有 {len(lines)} 个")
+            return
+        
+        # 先逐行校验并创建任务，全部通过后再统一保存和调度
+        tasks = []
+        errors = []
+        reserved_ids = set()
+        # 所有行一次解析完，使用同一个当前时间
+        for (line_no, _), parsed in zip(lines, parse_commands(instruct for _, instruct in lines)):
+            if isinstance(parsed, ParseError):
+                errors.append(f"第{line_no}行: 命令格式错误，{parsed}")
+                continue
+            task, error = await self._build_task(parsed, event, reserved_ids)
+            if error:
+                errors.append(f"第{line_no}行: {error}")
+                continue
+            reserved_ids.add(task.id)
+            tasks.append(task)
+        
+        if errors:
+            response = "导入失败，没有导入任何任务：\n" + "\n".join(errors[:20])
+            if len(errors) > 20:
+                response += f"\n……共 {len(errors)} 行有错误"
+            yield event.plain_result(response)
+            return
+        
+        for task in tasks:
+            self._index_task(task)
+        self.store.record_add_many([(task.msg_origin, task.to_dict()) for task in tasks])
+        self._compact_if_needed()
+        self._schedule_tasks(tasks)
+        logger.info(f"导入 {len(tasks)} 个任务")
+        
+        yield event.plain_result(f"已导入 {len(tasks)} 个任务，任务ID: {', '.join(task.id for task in tasks)}")
+    
+    async def _read_import_lines(self, event: AstrMessageEvent) -> list[tuple[int, str]]:
+        """读取命令中和附带文件中的任务，返回 [(行号, 命令), ...]"""
+        blocks = []
+        parts = event.get_message_str().split(None, 2)
+        if len(parts) > 2:
+            blocks.append(parts[2])
+        for component in event.get_messages():
+            if isinstance(component, File):
+                path = await component.get_file()
+                blocks.append(await asyncio.to_thread(self._read_text_file, path))
+        
+        lines = []
+        line_no = 0
+        for block in blocks:
+            for line in block.splitlines():
+                line_no += 1
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                # 兼容直接粘贴完整的 /time 命令
+                for prefix in ("/time ", "time "):
+                    if line.startswith(prefix):
+                        line = line[len(prefix):].strip()
+                        break
+                # 还原导出时转义的反斜杠和换行，其他反斜杠原样保留
+                lines.append((line_no, IMPORT_ESCAPE.sub(lambda m: "\n" if m[1] == "n" else "\\", line)))
+        return lines
+    
+    @staticmethod
+    def _read_text_file(path: str) -> str:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return f.read()
+    
+    @time.command("export")
+    async def export_tasks(self, event: AstrMessageEvent):
+        """导出定时任务，每行一个，格式与 /time import 相同
+        用法: /time export [all]
+        - all: 导出所有会话的任务，仅管理员可用
+        任务较多时分成多条消息发送
+        """
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
+        args = event.get_message_str().split()[2:]
+        show_all = "all" in args
+        if show_all and not event.is_admin():
+            yield event.plain_result("只有管理员可以导出所有会话的任务")
+            return
+        
+        tasks = self.task_index.values() if show_all else \
+            self.owner_index.get(event.unified_msg_origin, {}).values()
+        if not tasks:
+            yield event.plain_result("当前没有定时任务")
+            return
+        
+        # 每条消息最多 ls_page_size 行，逐条发送，不一次性拼出全部内容
+        chunk_size = max(1, self.config.get("ls_page_size", 20))
+        tasks = iter(list(tasks))
+        while chunk := list(itertools.islice(tasks, chunk_size)):
+            yield event.plain_result("\n".join(self._task_command(task) for task in chunk))
+    
+    @staticmethod
+    def _task_command(task: Task) -> str:
+        """把任务还原成 /time 命令（不含开头的 /time）"""
+        parts = [f"cron[{task.cron}]" if task.cron is not None else task.schedule_value]
+        if task.catchup:
+            parts.append(f"catchup[{task.catchup}]")
+        if task.timeout is not None:
+            parts.append(f"timeout[{task.timeout}]")
+        if task.overlap:
+            parts.append(f"overlap[{task.overlap}]")
+        if task.use_gpt:
+            parts.append("GPT")
+        parts.append(task.content.replace("\\", "\\\\").replace("\n", "\\n"))
+        if task.group_name:
+            parts.append(f"group[{task.group_name}]")
+        elif task.targets or task.msg_origin != task.owner:
+            parts.append(f"origin[{','.join(task.targets or [task.msg_origin])}]")
+        return " ".join(parts)
+
     @time.command("help")
     async def show_help(self, event: AstrMessageEvent):
+        if (result := self._unavailable_result(event)) is not None:
+            yield result
+            return
         yield event.plain_result("""AstrBot 定时任务插件 - 常用命令
 
 【创建任务】
 /time 每天 08:00 早安！
 /time 每周五 17:30 周末愉快！
+/time 每月15号 10:00 该交房租了
+/time 2小时后 开会
+/time 每30秒 心跳
+/time 工作日 09:00-18:00 每30分钟 起来活动一下
 /time cron[0 12 * * *] 午饭时间到！
 
 【使用GPT】
@@ -668,10 +1473,27 @@ class MyPlugin(Star):
 
 【群组消息】
 /time 每天 10:00 开始会议！ group[工作群]
-/time 周五 18:00 GPT 周末祝福 group[亲友群]
+/time 每周五 18:00 GPT 周末祝福 group[亲友群]
+/time 每天 08:00 GPT 说早安 group[工作群,亲友群]  # 多个群共用一次生成
+
+【错过补发】
+/time 每天 08:00 catchup[all] 打卡提醒  # 停机期间错过的每次都补发
+/time 每天 08:00 catchup[skip] 早安！    # 错过就不补发
+
+【运行控制】
+/time 每5分钟 timeout[60] GPT 播报  # GPT生成最多60秒
+/time 每5分钟 overlap[queue] GPT 总结  # 上一次没结束时排队，也可以用 skip、replace
+/time cancel 123  # 取消正在进行的运行
 
 【管理任务】
-/time ls    # 查看任务
+/time ls    # 查看当前会话的任务，/time ls 2 查看第2页
+/time ls gpt # 只看GPT任务，也可以用 cron、once 过滤
+/time next 5 # 最近要执行的5个任务
 /time rm 123 # 删除任务
+/time stats  # 查看执行统计
+
+【批量导入导出】
+/time export  # 导出当前会话的任务，每行一个
+/time import  # 换行后每行一个任务（格式同 /time），或附带任务文件
 
 注：群聊功能目前仅支持WechatPadPro平台""")
\ No newline at end of file
@@ -0,0 +1,154 @@
+import bisect
+import os
+from collections import OrderedDict
+from typing import Optional
+
+# 直方图的桶上限（毫秒），最后一个桶收集更大的值
+BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """固定桶的直方图，占用内存与样本数量无关"""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q: float) -> float:
+        """估算分位数：返回包含该分位的桶的上限，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+
+class _Stats:
+    """一个任务或一个平台的统计"""
+
+    __slots__ = ("runs", "failures", "misfires", "lateness", "llm", "send")
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0
+        self.lateness = Histogram()
+        self.llm = Histogram()
+        self.send = Histogram()
+
+
+class Metrics:
+    """任务执行统计：触发延迟、LLM耗时、发送耗时、失败和错过触发的次数
+
+    按平台和按任务分别统计。任务级统计只保留最近活跃的 max_tasks 个任务，
+    避免任务很多时内存无限增长。
+    """
+
+    def __init__(self, max_tasks: int = 1000):
+        self.max_tasks = max_tasks
+        self.platforms: dict[str, _Stats] = {}
+        self.tasks: OrderedDict[str, _Stats] = OrderedDict()
+
+    def _targets(self, task_id: str, platform: str) -> tuple[_Stats, _Stats]:
+        platform_stats = self.platforms.get(platform)
+        if platform_stats is None:
+            platform_stats = self.platforms[platform] = _Stats()
+        task_stats = self.tasks.get(task_id)
+        if task_stats is None:
+            task_stats = self.tasks[task_id] = _Stats()
+            if len(self.tasks) > self.max_tasks:
+                self.tasks.popitem(last=False)
+        else:
+            self.tasks.move_to_end(task_id)
+        return task_stats, platform_stats
+
+    def record_fire(self, task_id: str, platform: str, lateness_ms: float):
+        for stats in self._targets(task_id, platform):
+            stats.runs += 1
+            stats.lateness.observe(max(lateness_ms, 0))
+
+    def record_llm(self, task_id: str, platform: str, latency_ms: float):
+        for stats in self._targets(task_id, platform):
+            stats.llm.observe(latency_ms)
+
+    def record_send(self, task_id: str, platform: str, latency_ms: float):
+        for stats in self._targets(task_id, platform):
+            stats.send.observe(latency_ms)
+
+    def record_failure(self, task_id: str, platform: str):
+        for stats in self._targets(task_id, platform):
+            stats.failures += 1
+
+    def record_misfire(self, task_id: str, platform: str):
+        for stats in self._targets(task_id, platform):
+            stats.misfires += 1
+
+    def forget(self, task_id: str):
+        self.tasks.pop(task_id, None)
+
+    def task_stats(self, task_id: str) -> Optional[_Stats]:
+        return self.tasks.get(task_id)
+
+    @staticmethod
+    def format_stats(name: str, stats: _Stats) -> str:
+        lines = [f"{name}: 执行{stats.runs}次 失败{stats.failures}次 错过{stats.misfires}次"]
+        for label, histogram in (("触发延迟", stats.lateness), ("LLM耗时", stats.llm), ("发送耗时", stats.send)):
+            if histogram.count:
+                lines.append(
+                    f"  {label}: p50≤{histogram.quantile(0.5):.0f}ms "
+                    f"p99≤{histogram.quantile(0.99):.0f}ms max={histogram.max:.0f}ms"
+                )
+        return "\n".join(lines)
+
+    def to_prometheus(self, extra: Optional[dict[str, float]] = None) -> str:
+        """Prometheus 文本格式，只导出按平台的统计，避免任务ID造成标签过多"""
+        lines = []
+        for metric, attr in (("runs", "runs"), ("failures", "failures"), ("misfires", "misfires")):
+            name = f"timetask_{metric}_total"
+            lines.append(f"# TYPE {name} counter")
+            for platform, stats in self.platforms.items():
+                lines.append(f'{name}{{platform="{platform}"}} {getattr(stats, attr)}')
+
+        for metric, attr in (("fire_lateness", "lateness"), ("llm_latency", "llm"), ("send_latency", "send")):
+            name = f"timetask_{metric}_ms"
+            lines.append(f"# TYPE {name} histogram")
+            for platform, stats in self.platforms.items():
+                histogram = getattr(stats, attr)
+                cumulative = 0
+                for bound, count in zip(BUCKETS_MS + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{platform="{platform}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{platform="{platform}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{platform="{platform}"}} {histogram.count}')
+
+        # 其他组件的当前状态，键可以带标签，如 timetask_send_queue_depth{platform="x"}
+        typed = set()
+        for name, value in (extra or {}).items():
+            base = name.split("{", 1)[0]
+            if base not in typed:
+                typed.add(base)
+                lines.append(f"# TYPE {base} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, extra: Optional[dict[str, float]] = None):
+        """原子写入 Prometheus 文本文件，供 node_exporter textfile collector 等读取"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(extra))
+        os.replace(tmp_path, path)
@@ -0,0 +1,114 @@
+import os
+from datetime import datetime
+from typing import Collection, Optional
+
+from .task import Task
+from .triggers import cron_cache
+
+
+class FileWatcher:
+    """轮询文件的修改时间和大小，有变化时读取新内容
+
+    只依赖 os.stat，不需要 inotify 等外部服务；内容是否真的改变由调用方按哈希判断。
+    发现变化后等到下一次检查时文件没有再变化才读取，避免读到编辑器写到一半的文件。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stat = self._current_stat()
+        self._changing: Optional[tuple[int, int]] = None
+
+    def _current_stat(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self) -> Optional[bytes]:
+        """文件自上次检查后有变化时返回新内容，否则返回 None；文件被删除时也返回 None"""
+        stat = self._current_stat()
+        if stat == self._stat:
+            self._changing = None
+            return None
+        if stat != self._changing:
+            self._changing = stat
+            return None
+        self._stat = stat
+        self._changing = None
+        if stat is None:
+            return None
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def parse_tasks(
+    data: dict, catchup_policies: Collection[str], overlap_policies: Collection[str]
+) -> tuple[dict[str, Task], list[str]]:
+    """校验任务文件的内容 {msg_origin: [任务, ...]} 并转换为 {任务ID: Task}
+
+    返回 (任务, 错误列表)，错误列表不为空时不应使用其中的任何任务。
+    """
+    tasks = {}
+    errors = []
+    for msg_origin, origin_tasks in data.items():
+        if msg_origin.count(":") < 2 or not isinstance(origin_tasks, list):
+            errors.append(f"{msg_origin}: 键必须是 平台名:消息类型:会话ID，值必须是任务列表")
+            continue
+        for i, item in enumerate(origin_tasks, 1):
+            where = f"{msg_origin} 第{i}个任务"
+            error = _check_task(item, catchup_policies, overlap_policies)
+            if error is None:
+                try:
+                    task = Task.from_dict(msg_origin, item)
+                except (KeyError, TypeError, ValueError) as e:
+                    error = str(e)
+            if error is None and task.id in tasks:
+                error = f"任务ID {task.id} 重复"
+            if error is not None:
+                errors.append(f"{where}: {error}")
+                continue
+            tasks[task.id] = task
+    return tasks, errors
+
+
+def _check_task(item, catchup_policies: Collection[str], overlap_policies: Collection[str]) -> Optional[str]:
+    """检查单个任务字典，返回错误描述，没有错误时返回 None"""
+    if not isinstance(item, dict):
+        return "必须是对象"
+    if not isinstance(item.get("id"), str) or not item["id"]:
+        return "缺少任务ID"
+    if not isinstance(item.get("content"), str) or not item["content"]:
+        return "缺少消息内容"
+    cron = item.get("cron")
+    interval = item.get("interval")
+    if sum(item.get(key) is not None for key in ("cron", "datetime", "interval")) != 1:
+        return "cron、datetime 和 interval 必须有且只有一个"
+    if interval is not None and not (type(interval) is int and interval > 0):
+        return f"interval 必须是正整数秒数: {interval}"
+    if cron is not None:
+        try:
+            cron_cache.trigger(cron)
+        except (TypeError, ValueError) as e:
+            return f"cron 表达式 {cron} 无效: {e}"
+    for key in ("datetime", "created_at", "last_run"):
+        value = item.get(key)
+        if value is None:
+            continue
+        try:
+            datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return f"{key} 时间格式无效: {value}"
+    catchup = item.get("catchup")
+    if catchup is not None and catchup not in catchup_policies:
+        return f"未知的补发策略: {catchup}"
+    timeout = item.get("timeout")
+    if timeout is not None and not (type(timeout) is int and timeout >= 0):
+        return f"timeout 必须是非负整数秒数: {timeout}"
+    overlap = item.get("overlap")
+    if overlap is not None and overlap not in overlap_policies:
+        return f"未知的重叠策略: {overlap}"
+    targets = item.get("targets")
+    if targets is not None and not (isinstance(targets, list) and all(isinstance(t, str) for t in targets)):
+        return "targets 必须是消息来源的列表"
+    return None
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from astrbot.api import logger
+
+from .task import Task
+
+
+class RetryEntry:
+    """一个任务一次失败的运行中还没有完成的部分"""
+
+    __slots__ = ("task", "targets", "content", "attempts", "next_at")
+
+    def __init__(self, task: Task, targets: list[str], content: Optional[str], attempts: int = 0, next_at: float = 0):
+        # 任务的快照：一次性任务执行后已经从任务列表中删除，重试仍然需要它
+        self.task = task
+        # 还没有发送成功的目标
+        self.targets = targets
+        # 要发送的内容，GPT任务生成失败时为 None，重试时重新生成
+        self.content = content
+        # 已经重试的次数
+        self.attempts = attempts
+        # 下次重试的时间戳
+        self.next_at = next_at
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RetryEntry":
+        return cls(
+            task=Task.from_dict(data["origin"], data["task"]),
+            targets=data["targets"],
+            content=data.get("content"),
+            attempts=data.get("attempts", 0),
+            next_at=data.get("next_at", 0),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "origin": self.task.msg_origin,
+            "task": self.task.to_dict(),
+            "targets": self.targets,
+            "content": self.content,
+            "attempts": self.attempts,
+            "next_at": self.next_at,
+        }
+
+
+class RetryQueue:
+    """发送失败和LLM生成失败的重试队列
+
+    - 每个任务最多一条待重试记录，同一任务新的失败替换旧记录（旧内容已经过时），已用的重试次数保留，
+      所以一个任务无论失败多少次，在成功或放弃之前最多重试 max_attempts 次
+    - 第 n 次重试在失败后 base_delay * 2^n 秒（不超过 max_delay，带 10% 随机抖动）进行
+    - 最多保存 max_size 条，超出时丢弃最早加入的
+    - 重试在独立的 asyncio 任务中执行，不占用调度器；LLM调用和发送各自有超时，超时按失败计算
+    - 队列变化后在后台线程写入 retry.json，重启后继续重试
+    """
+
+    def __init__(
+        self,
+        path: str,
+        handler: Callable[[RetryEntry], Awaitable[bool]],
+        max_attempts: int = 5,
+        base_delay: float = 30,
+        max_delay: float = 3600,
+        max_size: int = 1000,
+    ):
+        self.path = path
+        # 执行一次重试，全部完成返回 True；可以修改 entry 记录部分进展（如已生成的内容、剩下的目标）
+        self.handler = handler
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self._entries: OrderedDict[str, RetryEntry] = OrderedDict()
+        # 正在重试的任务ID
+        self._running: set[str] = set()
+        self._attempts: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._saver: Optional[asyncio.Task] = None
+        self._dirty = False
+        self.given_up = 0
+
+    async def load(self):
+        """读取上次保存的待重试记录，开始重试；读取和解析文件在线程中进行"""
+        try:
+            entries = await asyncio.to_thread(self._read)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"读取重试队列 {self.path} 失败，已忽略: {e}")
+            return
+        for entry in entries:
+            self._entries[entry.task.id] = entry
+        if entries:
+            logger.info(f"重试队列中有 {len(entries)} 个任务待重试")
+            self._start()
+
+    def _read(self) -> list[RetryEntry]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [RetryEntry.from_dict(data) for data in json.load(f)]
+
+    def add(self, task: Task, targets: list[str], content: Optional[str]):
+        """记录一次失败的运行，content 为 None 表示需要重新生成内容"""
+        if self.max_attempts <= 0:
+            return
+        old = self._entries.pop(task.id, None)
+        attempts = old.attempts if old else 0
+        if attempts >= self.max_attempts:
+            logger.error(f"任务 {task.id} 已用完 {self.max_attempts} 次重试，不再重试")
+            self.given_up += 1
+            self._save_soon()
+            return
+        self._entries[task.id] = RetryEntry(task, list(targets), content, attempts, time.time() + self._backoff(attempts))
+        while len(self._entries) > self.max_size:
+            dropped, _ = self._entries.popitem(last=False)
+            logger.warning(f"重试队列已满，丢弃任务 {dropped} 的重试")
+            self.given_up += 1
+        self._save_soon()
+        self._start()
+        self._wakeup.set()
+
+    def discard(self, task_id: str):
+        """任务被删除时放弃它的重试"""
+        if self._entries.pop(task_id, None) is not None:
+            self._save_soon()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.base_delay * 2 ** attempts, self.max_delay)
+        return delay * random.uniform(0.9, 1.1)
+
+    def _start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """等到最早的重试时间，把到期的重试各自放到独立的 asyncio 任务中执行"""
+        while True:
+            self._wakeup.clear()
+            waiting = [entry.next_at for task_id, entry in self._entries.items() if task_id not in self._running]
+            if not waiting:
+                await self._wakeup.wait()
+                continue
+            delay = min(waiting) - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            now = time.time()
+            for task_id, entry in self._entries.items():
+                if entry.next_at <= now and task_id not in self._running:
+                    self._running.add(task_id)
+                    attempt = asyncio.create_task(self._attempt(entry))
+                    self._attempts.add(attempt)
+                    attempt.add_done_callback(self._attempts.discard)
+
+    async def _attempt(self, entry: RetryEntry):
+        task_id = entry.task.id
+        try:
+            done = await self.handler(entry)
+        except Exception as e:
+            logger.error(f"重试任务 {task_id} 出错: {e}")
+            done = False
+        finally:
+            self._running.discard(task_id)
+        if self._entries.get(task_id) is not entry:
+            # 重试期间任务被删除，或者有了新的失败记录
+            self._wakeup.set()
+            return
+        if done:
+            del self._entries[task_id]
+            logger.info(f"任务 {task_id} 第{entry.attempts + 1}次重试成功")
+        else:
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                del self._entries[task_id]
+                self.given_up += 1
+                logger.error(f"任务 {task_id} 重试 {entry.attempts} 次仍然失败，放弃")
+            else:
+                entry.next_at = time.time() + self._backoff(entry.attempts)
+        self._save_soon()
+        self._wakeup.set()
+
+    def _save_soon(self):
+        """在后台线程写入 retry.json，写入期间的变化在写完后再写一次"""
+        self._dirty = True
+        if self._saver is None or self._saver.done():
+            self._saver = asyncio.create_task(self._save())
+
+    async def _save(self):
+        while self._dirty:
+            self._dirty = False
+            data = [entry.to_dict() for entry in self._entries.values()]
+            try:
+                await asyncio.to_thread(self._write, data)
+            except OSError as e:
+                logger.warning(f"写入重试队列失败: {e}")
+
+    def _write(self, data: list):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def close(self):
+        """停止重试，保存剩下的记录；正在进行的重试被中断，下次启动时再试"""
+        for task in (self._worker, *self._attempts):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*self._attempts, return_exceptions=True)
+        if self._saver is not None:
+            await asyncio.gather(self._saver, return_exceptions=True)
+        try:
+            await asyncio.to_thread(self._write, [entry.to_dict() for entry in self._entries.values()])
+        except OSError as e:
+            logger.warning(f"写入重试队列失败: {e}")
@@ -0,0 +1,115 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from astrbot.api import logger
+
+# run() 的结果
+DONE = "done"
+SKIPPED = "skipped"
+CANCELLED = "cancelled"
+REPLACED = "replaced"
+
+
+class RunManager:
+    """任务每次运行的重叠控制和取消
+
+    每次运行放在独立的 asyncio 任务中执行，被取消时取消这个任务，其中正在等待的LLM调用和消息发送随之取消。
+    运行本身不限时：排队等待LLM并发名额和发送令牌不算超时，超时只限制拿到名额后的LLM调用和发送本身，
+    分别由 LLMScheduler 和 OutboundSender 处理，超时按失败进入重试队列。
+
+    同一任务上一次运行还没结束时又到了触发时间，按重叠策略处理：
+    - skip: 跳过这次触发
+    - queue: 等上一次结束后再运行；每个任务最多排队一次，排队期间再到的触发跳过
+    - replace: 取消上一次运行，立即开始这次
+
+    cancel() 同时取消正在进行的运行和排队等待的运行，删除任务后不会再有排队的运行开始。
+    """
+
+    def __init__(self, overlap: str = "skip"):
+        # 默认的重叠策略，任务可以单独指定
+        self.overlap = overlap
+        self._running: dict[str, asyncio.Task] = {}
+        self._queued: set[str] = set()
+        # 排队期间被 cancel() 的任务，排队的运行醒来后不再执行
+        self._dropped: set[str] = set()
+        # 被取消的运行及原因（cancel / replace），用来区分外部取消
+        self._stopped: dict[asyncio.Task, str] = {}
+        self.skipped = 0
+        self.cancelled = 0
+        self.replaced = 0
+
+    async def run(
+        self,
+        task_id: str,
+        func: Callable[[], Awaitable],
+        overlap: Optional[str] = None,
+    ) -> str:
+        """执行一次运行，返回 done / skipped / cancelled / replaced；运行中的异常照常抛出"""
+        overlap = overlap or self.overlap
+        current = self._running.get(task_id)
+        if current is not None:
+            if overlap == "replace":
+                logger.warning(f"任务 {task_id} 上一次运行还没有结束，取消后开始新的运行")
+                self._stop(current, REPLACED)
+            elif overlap == "queue" and task_id not in self._queued:
+                self._queued.add(task_id)
+                try:
+                    while (current := self._running.get(task_id)) is not None:
+                        await asyncio.wait({current})
+                finally:
+                    self._queued.discard(task_id)
+                    dropped = task_id in self._dropped
+                    self._dropped.discard(task_id)
+                if dropped:
+                    return CANCELLED
+            else:
+                logger.warning(f"任务 {task_id} 上一次运行还没有结束，跳过这次触发")
+                self.skipped += 1
+                return SKIPPED
+
+        run = asyncio.create_task(func())
+        self._running[task_id] = run
+        try:
+            await run
+            return DONE
+        except asyncio.CancelledError:
+            reason = self._stopped.pop(run, None)
+            if reason is None:
+                # 外部取消（如插件停止），连同运行一起取消
+                raise
+            return reason
+        finally:
+            self._stopped.pop(run, None)
+            if self._running.get(task_id) is run:
+                del self._running[task_id]
+
+    def _stop(self, run: asyncio.Task, reason: str):
+        self._stopped[run] = reason
+        run.cancel()
+        if reason == CANCELLED:
+            self.cancelled += 1
+        else:
+            self.replaced += 1
+
+    def cancel(self, task_id: str) -> bool:
+        """取消任务正在进行的运行和排队等待的运行，都没有时返回 False"""
+        cancelled = False
+        if task_id in self._queued and task_id not in self._dropped:
+            self._dropped.add(task_id)
+            self.cancelled += 1
+            cancelled = True
+        run = self._running.get(task_id)
+        if run is not None and not run.done():
+            self._stop(run, CANCELLED)
+            cancelled = True
+        return cancelled
+
+    def __len__(self):
+        return len(self._running)
+
+    async def close(self):
+        """取消所有正在进行的运行"""
+        runs = list(self._running.values())
+        for run in runs:
+            run.cancel()
+        await asyncio.gather(*runs, return_exceptions=True)
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+
+from astrbot.api import logger
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 条，最多连续发送 burst 条"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def acquire_delay(self) -> float:
+        """尝试取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class _PlatformQueue:
+    """单个平台的发送队列
+
+    同一 msg_origin 的消息严格按顺序发送，不同 msg_origin 之间轮流发送，
+    避免某个群的大量消息把其他群饿死。
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_size: int):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_size = max_size
+        # msg_origin -> 待发送的 (消息链, future)
+        self.origins: OrderedDict[str, deque] = OrderedDict()
+        self.depth = 0
+        self.max_depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.blocked = 0
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+        self.worker: Optional[asyncio.Task] = None
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "blocked": self.blocked,
+        }
+
+
+class OutboundSender:
+    """按平台限速的消息发送管道
+
+    msg_origin 的前缀(平台名)决定使用哪个队列和令牌桶。
+    队列满时 send() 会等待，直到有空位（背压），而不是无限堆积。
+    单条消息发送超过 send_timeout 秒时取消并按失败处理，卡住的平台接口不会堵住整个队列。
+    """
+
+    def __init__(
+        self,
+        send_func: Callable[[str, object], Awaitable],
+        rate: float = 5,
+        burst: int = 10,
+        max_queue: int = 1000,
+        platform_limits: Optional[dict[str, tuple[float, int]]] = None,
+        send_timeout: float = 30,
+    ):
+        self.send_func = send_func
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        # 平台名 -> (rate, burst)，覆盖默认限速
+        self.platform_limits = platform_limits or {}
+        # 0 表示不限制
+        self.send_timeout = send_timeout
+        self._queues: dict[str, _PlatformQueue] = {}
+
+    @staticmethod
+    def parse_limits(items: list[str]) -> dict[str, tuple[float, int]]:
+        """解析配置中的 "平台名:每秒条数:突发条数" 列表"""
+        limits = {}
+        for item in items:
+            try:
+                name, rate, burst = item.split(":")
+                limits[name.strip()] = (float(rate), int(burst))
+            except ValueError:
+                logger.warning(f"发送限速配置格式错误，已忽略: {item}")
+        return limits
+
+    async def send(self, msg_origin: str, message_chain):
+        """排队发送消息，等待实际发送完成并返回发送结果，发送失败时抛出异常"""
+        queue = self._get_queue(msg_origin.split(":", 1)[0])
+        if queue.depth >= queue.max_size:
+            queue.blocked += 1
+        while queue.depth >= queue.max_size:
+            queue.not_full.clear()
+            await queue.not_full.wait()
+
+        future = asyncio.get_running_loop().create_future()
+        if msg_origin not in queue.origins:
+            queue.origins[msg_origin] = deque()
+        queue.origins[msg_origin].append((message_chain, future))
+        queue.depth += 1
+        if queue.depth > queue.max_depth:
+            queue.max_depth = queue.depth
+            if queue.max_depth * 2 == queue.max_size:
+                logger.warning(f"平台 {queue.name} 发送队列已积压 {queue.depth} 条，请检查限速配置")
+        queue.not_empty.set()
+
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._run(queue))
+        return await future
+
+    def _get_queue(self, platform_name: str) -> _PlatformQueue:
+        queue = self._queues.get(platform_name)
+        if queue is None:
+            rate, burst = self.platform_limits.get(platform_name, (self.rate, self.burst))
+            queue = _PlatformQueue(platform_name, rate, burst, self.max_queue)
+            self._queues[platform_name] = queue
+        return queue
+
+    async def _run(self, queue: _PlatformQueue):
+        while True:
+            if not queue.origins:
+                queue.not_empty.clear()
+                await queue.not_empty.wait()
+                continue
+
+            delay = queue.bucket.acquire_delay()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+
+            # 轮流：取出队首的 msg_origin 的一条消息，还有剩余则移到队尾
+            msg_origin, messages = next(iter(queue.origins.items()))
+            message_chain, future = messages.popleft()
+            if messages:
+                queue.origins.move_to_end(msg_origin)
+            else:
+                del queue.origins[msg_origin]
+            queue.depth -= 1
+            queue.not_full.set()
+
+            if future.cancelled():
+                continue
+            try:
+                if self.send_timeout > 0:
+                    try:
+                        result = await asyncio.wait_for(self.send_func(msg_origin, message_chain), self.send_timeout)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError(f"发送超过 {self.send_timeout} 秒没有完成")
+                else:
+                    result = await self.send_func(msg_origin, message_chain)
+                queue.sent += 1
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                queue.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+
+    def stats(self) -> dict[str, dict]:
+        """各平台的队列深度、历史最大深度、发送成功/失败数和因队列满而等待的次数"""
+        return {name: queue.stats() for name, queue in self._queues.items()}
+
+    async def close(self):
+        """停止发送，未发送的消息以取消结束"""
+        for queue in self._queues.values():
+            if queue.worker is not None:
+                queue.worker.cancel()
+            for messages in queue.origins.values():
+                for _, future in messages:
+                    if not future.done():
+                        future.cancel()
+            queue.origins.clear()
+            queue.depth = 0
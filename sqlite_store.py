@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+from typing import Optional
+
+from astrbot.api import logger
+
+from .store import BaseTaskStore, TaskStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    msg_origin TEXT NOT NULL,
+    content TEXT NOT NULL,
+    use_gpt INTEGER NOT NULL DEFAULT 0,
+    group_name TEXT,
+    targets TEXT,
+    cron TEXT,
+    datetime TEXT,
+    created_at TEXT,
+    last_run TEXT,
+    catchup TEXT,
+    creator TEXT,
+    interval INTEGER,
+    timeout INTEGER,
+    overlap TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_origin ON tasks(msg_origin);
+CREATE INDEX IF NOT EXISTS idx_tasks_creator ON tasks(creator);
+-- 旧版本按下次触发时间建的索引，下次触发时间只在内存中维护
+DROP INDEX IF EXISTS idx_tasks_next_fire;
+"""
+
+_COLUMNS = ("id", "msg_origin", "content", "use_gpt", "group_name", "targets", "cron", "datetime",
+            "created_at", "last_run", "catchup", "creator", "interval",
+            "timeout", "overlap")
+
+# 旧版本数据库中没有的列：(列名, 类型)
+_ADDED_COLUMNS = (("creator", "TEXT"), ("interval", "INTEGER"), ("timeout", "INTEGER"), ("overlap", "TEXT"))
+
+
+class SqliteTaskStore(BaseTaskStore):
+    """SQLite 任务存储(tasks.db)
+
+    每个任务一行，新建、删除、更新上次执行时间都是按主键的单行操作，
+    不需要像 tasks.json 那样整体重写。msg_origin 和创建者会话(creator)上建有索引，可以直接按会话查询。
+    打开数据库和建表在 load() 中进行（插件在后台线程中调用），不阻塞事件循环。
+
+    写入同样在后台线程中进行，合并窗口内的所有变更在一个事务中提交。
+    第一次启动时如果数据库为空而存在 tasks.json，会自动把其中的任务(含未压缩的日志)迁移过来，
+    原文件重命名为 *.migrated 保留。
+    """
+
+    def __init__(self, data_dir: str = "data/timetask", flush_interval: float = 1.0):
+        super().__init__(flush_interval)
+        self.data_dir = data_dir
+        self.db_path = os.path.join(data_dir, "tasks.db")
+        os.makedirs(data_dir, exist_ok=True)
+        # 写入使用后台线程自己的连接
+        self._writer: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load(self) -> dict:
+        conn = self._connect()
+        try:
+            self._setup(conn)
+            empty = conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None
+            if empty and os.path.exists(os.path.join(self.data_dir, "tasks.json")):
+                self._migrate_from_json(conn)
+            return self._read(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _setup(conn: sqlite3.Connection):
+        """建表，并给旧版本的数据库补上新增的列"""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        for name, column_type in _ADDED_COLUMNS if existing else ():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE tasks ADD COLUMN {name} {column_type}")
+        conn.executescript(_SCHEMA)
+
+    def _read(self, conn: sqlite3.Connection) -> dict:
+        tasks = {}
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM tasks")
+        for (task_id, msg_origin, content, use_gpt, group_name, targets, cron, run_at,
+             created_at, last_run, catchup, creator, interval, timeout, overlap) in rows:
+            task = {
+                "id": task_id,
+                "content": content,
+                "use_gpt": bool(use_gpt),
+                "group_name": group_name,
+                "created_at": created_at,
+            }
+            if cron is not None:
+                task["cron"] = cron
+            elif interval is not None:
+                task["interval"] = interval
+            else:
+                task["datetime"] = run_at
+            if targets:
+                task["targets"] = json.loads(targets)
+            if last_run:
+                task["last_run"] = last_run
+            if catchup:
+                task["catchup"] = catchup
+            if timeout is not None:
+                task["timeout"] = timeout
+            if overlap:
+                task["overlap"] = overlap
+            if creator:
+                task["creator"] = creator
+            tasks.setdefault(msg_origin, []).append(task)
+        logger.debug(f"从 {self.db_path} 加载任务")
+        return tasks
+
+    def _migrate_from_json(self, conn: sqlite3.Connection):
+        """一次性从 tasks.json(+ tasks.journal) 迁移"""
+        json_store = TaskStore(self.data_dir)
+        tasks = json_store.load()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO tasks ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                (self._row(msg_origin, task) for msg_origin, origin_tasks in tasks.items() for task in origin_tasks),
+            )
+        json_store.close()
+        for path in (json_store.snapshot_path, json_store.rotated_path, json_store.journal_path):
+            if os.path.exists(path):
+                os.replace(path, f"{path}.migrated")
+        logger.info(f"已将 {sum(len(t) for t in tasks.values())} 个任务从 tasks.json 迁移到 {self.db_path}")
+
+    @staticmethod
+    def _row(msg_origin: str, task: dict) -> tuple:
+        targets = task.get("targets")
+        return (
+            task["id"],
+            msg_origin,
+            task["content"],
+            int(task.get("use_gpt", False)),
+            task.get("group_name"),
+            json.dumps(targets, ensure_ascii=False) if targets else None,
+            task.get("cron"),
+            task.get("datetime"),
+            task.get("created_at"),
+            task.get("last_run"),
+            task.get("catchup"),
+            task.get("creator"),
+            task.get("interval"),
+            task.get("timeout"),
+            task.get("overlap"),
+        )
+
+    def record_add(self, msg_origin: str, task: dict):
+        self._enqueue("add", (msg_origin, task))
+
+    def record_add_many(self, entries: list[tuple[str, dict]]):
+        if entries:
+            self._enqueue("add_many", entries)
+
+    def record_remove(self, task_id: str, fired: bool = False):
+        self._enqueue("rm", task_id)
+
+    def record_run(self, task_id: str, at: str):
+        self._enqueue("ran", (task_id, at))
+
+    def _write(self, items: list):
+        if self._writer is None:
+            self._writer = self._connect()
+        conn = self._writer
+        with conn:
+            for kind, item in items:
+                if kind == "add":
+                    msg_origin, task = item
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO tasks ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                        self._row(msg_origin, task),
+                    )
+                elif kind == "add_many":
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO tasks ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                        (self._row(msg_origin, task) for msg_origin, task in item),
+                    )
+                elif kind == "rm":
+                    conn.execute("DELETE FROM tasks WHERE id = ?", (item,))
+                elif kind == "ran":
+                    task_id, at = item
+                    conn.execute("UPDATE tasks SET last_run = ? WHERE id = ?", (at, task_id))
+        logger.debug(f"写入任务数据库 {len(items)} 条变更")
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
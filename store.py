@@ -0,0 +1,386 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from astrbot.api import logger
+
+
+class BaseTaskStore:
+    """任务存储后端的基类，负责后台写入线程（write-behind）
+
+    变更先放进内存队列，从第一条待写记录起等待 flush_interval 秒，
+    再由后台线程调用 _write() 一次性写入，同一时间大量变更只产生一次写入，也不会阻塞事件循环。
+
+    子类实现 load()、record_*() 和 _write()，需要时覆盖 compact() 和 _close()。
+    """
+
+    # 是否需要定期把全部任务写成快照（compact）
+    compactable = False
+    # 是否支持在运行中重新读取被外部修改的任务文件（reload）
+    reloadable = False
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+
+        # 待写队列，元素为 (类型, 数据)，按顺序写入
+        self._cond = threading.Condition()
+        self._pending: list[tuple[str, object]] = []
+        self._first_pending_at = 0.0
+        self._writing = False
+        self._closing = False
+        self._worker: Optional[threading.Thread] = None
+        # 每次有新的变更时加一，用于判断一段时间内任务是否有变化
+        self.version = 0
+
+    def load(self) -> dict:
+        """读取所有任务，返回 {msg_origin: [task, ...]}"""
+        raise NotImplementedError
+
+    def record_add(self, msg_origin: str, task: dict):
+        """记录新建任务"""
+        raise NotImplementedError
+
+    def record_add_many(self, entries: list[tuple[str, dict]]):
+        """批量记录新建任务 [(msg_origin, task), ...]，作为一次写入"""
+        for msg_origin, task in entries:
+            self.record_add(msg_origin, task)
+
+    def record_remove(self, task_id: str, fired: bool = False):
+        """记录删除任务，fired 表示一次性任务执行完毕后的删除"""
+        raise NotImplementedError
+
+    def record_run(self, task_id: str, at: str):
+        """记录循环任务的上次执行时间"""
+        raise NotImplementedError
+
+    def reload(self, content: bytes) -> dict:
+        """按外部修改后的文件内容重新读取所有任务，不改变存储自身的状态，只有 reloadable 的后端需要"""
+        raise NotImplementedError
+
+    @property
+    def needs_compaction(self) -> bool:
+        return False
+
+    def compact(self, snapshot: Callable[[], dict]):
+        """把当前任务状态整体写入，只有 compactable 的后端需要
+
+        snapshot 在后台线程中调用，返回 {msg_origin: [task, ...]}
+        """
+
+    def _write(self, items: list):
+        raise NotImplementedError
+
+    def _close(self):
+        """后台线程退出后释放文件等资源"""
+
+    def _enqueue(self, kind: str, item):
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("TaskStore 已关闭")
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending.append((kind, item))
+            self.version += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="timetask-store", daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        """后台写入线程"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # 合并窗口：等到第一条记录入队满 flush_interval 秒，关闭时立即写入
+                while not self._closing:
+                    remaining = self._first_pending_at + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                items, self._pending = self._pending, []
+                self._writing = True
+
+            try:
+                self._write(items)
+            except Exception as e:
+                logger.error(f"写入任务数据失败: {e}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def flush(self):
+        """立即写入所有待写数据并等待完成"""
+        with self._cond:
+            self._first_pending_at = 0.0
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                self._cond.wait()
+
+    def close(self):
+        """写入所有待写数据，停止后台线程并释放资源"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+        self._close()
+
+
+class TaskStore(BaseTaskStore):
+    """任务持久化：快照(tasks.json) + 追加日志(tasks.journal)
+
+    每次变更只向日志追加一行记录，启动时先读快照再按顺序重放日志；
+    日志累积到一定数量后压缩为新快照。
+    快照通过临时文件 + rename 原子写入，写到一半崩溃也不会留下截断的 tasks.json。
+
+    所有磁盘写入都在后台线程中完成（write-behind），见 BaseTaskStore。
+
+    日志记录格式（每行一个JSON）：
+    - {"op": "add", "origin": <msg_origin>, "task": {...}}
+    - {"op": "rm", "id": <任务ID>}
+    - {"op": "fired", "id": <任务ID>}  一次性任务执行完毕
+    - {"op": "ran", "id": <任务ID>, "at": <时间>}  循环任务执行，更新上次执行时间
+    """
+
+    compactable = True
+    reloadable = True
+
+    def __init__(self, data_dir: str = "data/timetask", flush_interval: float = 1.0, compact_threshold: int = 1000):
+        super().__init__(flush_interval)
+        self.data_dir = data_dir
+        self.snapshot_path = os.path.join(data_dir, "tasks.json")
+        self.journal_path = os.path.join(data_dir, "tasks.journal")
+        # 压缩期间被轮转出去的旧日志，压缩完成后删除
+        self.rotated_path = self.journal_path + ".1"
+        self.compact_threshold = compact_threshold
+
+        # 待写队列的元素为 ("line", 日志行)、("ran", 任务ID) 或 ("snapshot", 生成任务状态的函数)
+        self._journal = None
+        self._journal_records = 0
+        # 还没写入的上次执行时间 {任务ID: 时间}，同一合并窗口内同一任务只写最新的一条
+        self._runs: dict[str, str] = {}
+        # 最近一次加载或写入的快照内容的哈希，用于区分外部修改和自己写入的快照
+        self.snapshot_digest: Optional[str] = None
+
+        os.makedirs(data_dir, exist_ok=True)
+
+    def load(self) -> dict:
+        """读取快照并重放日志，返回 {msg_origin: [task, ...]}"""
+        if not os.path.exists(self.snapshot_path):
+            self._write_atomic(self.snapshot_path, self._encode({}))
+            logger.info(f"没有找到任务配置文件，创建{self.snapshot_path}")
+
+        with open(self.snapshot_path, "rb") as f:
+            logger.debug("加载任务配置文件")
+            content = f.read()
+        tasks = json.loads(content)
+        self.snapshot_digest = self.digest(content)
+
+        replayed = self._replay_journals(tasks)
+        if replayed:
+            logger.info(f"重放任务日志 {replayed} 条")
+
+        self._journal_records = replayed
+        return tasks
+
+    def reload(self, content: bytes) -> dict:
+        """解析外部修改后的快照内容并重放当前日志，得到与重启时加载相同的结果
+
+        调用前先 flush()，保证已入队的日志记录都在文件中。内容不是合法 JSON 时抛出 ValueError。
+        """
+        tasks = json.loads(content)
+        if not isinstance(tasks, dict):
+            raise ValueError("顶层必须是 {msg_origin: [任务, ...]} 形式的对象")
+        self._replay_journals(tasks)
+        return tasks
+
+    @staticmethod
+    def digest(content: bytes) -> str:
+        return hashlib.sha1(content).hexdigest()
+
+    def _replay_journals(self, tasks: dict) -> int:
+        # 上次压缩中途退出时旧日志还在，需要先于当前日志重放；重放是幂等的
+        return sum(self._replay(path, tasks) for path in (self.rotated_path, self.journal_path))
+
+    def _replay(self, path: str, tasks: dict) -> int:
+        """将日志文件中的记录应用到 tasks 上，返回应用的记录数"""
+        if not os.path.exists(path):
+            return 0
+
+        # 先建立 id -> origin 和 id -> 任务 的索引，避免每条记录都扫描全部任务
+        index = {task["id"]: origin for origin, origin_tasks in tasks.items() for task in origin_tasks}
+        by_id = {task["id"]: task for origin_tasks in tasks.values() for task in origin_tasks}
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 通常是写入最后一行时崩溃，之前的记录仍然有效
+                    logger.warning(f"任务日志 {path} 第{line_no}行损坏，已跳过")
+                    continue
+
+                op = record.get("op")
+                if op == "add":
+                    task = record["task"]
+                    self._drop(tasks, index, task["id"])
+                    tasks.setdefault(record["origin"], []).append(task)
+                    index[task["id"]] = record["origin"]
+                    by_id[task["id"]] = task
+                elif op in ("rm", "fired"):
+                    self._drop(tasks, index, record["id"])
+                    by_id.pop(record["id"], None)
+                elif op == "ran":
+                    task = by_id.get(record["id"])
+                    if task is not None:
+                        task["last_run"] = record["at"]
+                else:
+                    logger.warning(f"任务日志 {path} 第{line_no}行未知操作: {op}")
+                    continue
+                count += 1
+        return count
+
+    @staticmethod
+    def _drop(tasks: dict, index: dict, task_id: str):
+        origin = index.pop(task_id, None)
+        if origin is None:
+            return
+        remaining = [t for t in tasks.get(origin, []) if t["id"] != task_id]
+        if remaining:
+            tasks[origin] = remaining
+        else:
+            tasks.pop(origin, None)
+
+    def record_add(self, msg_origin: str, task: dict):
+        self._append({"op": "add", "origin": msg_origin, "task": task})
+
+    def record_add_many(self, entries: list[tuple[str, dict]]):
+        if not entries:
+            return
+        self._journal_records += len(entries)
+        self._enqueue("line", "".join(
+            json.dumps({"op": "add", "origin": msg_origin, "task": task}, ensure_ascii=False) + "\n"
+            for msg_origin, task in entries
+        ))
+
+    def record_remove(self, task_id: str, fired: bool = False):
+        self._append({"op": "fired" if fired else "rm", "id": task_id})
+
+    def record_run(self, task_id: str, at: str):
+        with self._cond:
+            queued = task_id in self._runs
+            self._runs[task_id] = at
+            self.version += 1
+        if not queued:
+            self._journal_records += 1
+            self._enqueue("ran", task_id)
+
+    def _append(self, record: dict):
+        self._journal_records += 1
+        self._enqueue("line", json.dumps(record, ensure_ascii=False) + "\n")
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self._journal_records >= self.compact_threshold
+
+    def compact(self, snapshot: Callable[[], dict]):
+        """把当前任务状态写成新快照并清空日志
+
+        snapshot 在后台线程中调用，生成任务状态和编码都不占用事件循环。
+        在此之前入队的日志记录已经体现在快照中，之后的记录写入新日志（重放是幂等的，快照包含更新的状态也没有问题）。
+        """
+        self._journal_records = 0
+        self._enqueue("snapshot", snapshot)
+
+    def _write(self, items: list):
+        # 同一批中只写最后一个快照，它已经包含之前所有快照和记录的内容
+        last = max((i for i, (kind, _) in enumerate(items) if kind == "snapshot"), default=None)
+        if last is not None:
+            # 快照之前的记录先落盘到即将被轮转的日志中
+            self._write_journal(self._lines(items[:last]))
+            self._rotate_journal()
+            self._write_snapshot(items[last][1])
+            items = items[last + 1:]
+        self._write_journal(self._lines(items))
+
+    def _lines(self, items: list) -> list[str]:
+        """把待写记录转换为日志行，ran 记录取该任务最新的执行时间"""
+        lines = []
+        for kind, item in items:
+            if kind == "line":
+                lines.append(item)
+            elif kind == "ran":
+                with self._cond:
+                    at = self._runs.pop(item, None)
+                if at is not None:
+                    lines.append(json.dumps({"op": "ran", "id": item, "at": at}, ensure_ascii=False) + "\n")
+        return lines
+
+    def _write_journal(self, lines: list):
+        if not lines:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        logger.debug(f"写入任务日志 {len(lines)} 条")
+
+    def _rotate_journal(self):
+        """轮转日志：之后的追加写入新日志，旧日志在快照落盘后删除"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.rotated_path):
+            # 上次压缩失败遗留的旧日志，合并到一起以保持重放顺序
+            with open(self.journal_path, "r", encoding="utf-8") as src, \
+                    open(self.rotated_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.rotated_path)
+
+    def _write_snapshot(self, snapshot: Callable[[], dict]):
+        try:
+            content = self._encode(snapshot())
+            # 先记录哈希再替换文件，监视 tasks.json 时不会把自己写入的快照当成外部修改
+            self.snapshot_digest = self.digest(content)
+            self._write_atomic(self.snapshot_path, content)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+            logger.debug(f"任务快照已写入 {self.snapshot_path}")
+        except Exception as e:
+            # 旧日志仍保留，下次启动会重放，不会丢数据
+            logger.error(f"写入任务快照失败: {e}")
+
+    @staticmethod
+    def _encode(tasks: dict) -> bytes:
+        return json.dumps(tasks, ensure_ascii=False, indent=2).encode("utf-8")
+
+    @staticmethod
+    def _write_atomic(path: str, content: bytes):
+        """先写临时文件再 rename，保证目标文件要么是旧内容要么是完整的新内容"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,186 @@
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Collection, Iterable, Optional
+
+from .triggers import cron_cache
+
+
+def format_timestamp(timestamp: int) -> str:
+    """时间戳转换为 tasks.json 中保存的时间格式"""
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_interval(seconds: int) -> str:
+    """间隔秒数转换为命令中的写法，如 每30秒、每5分钟、每2小时"""
+    if seconds % 3600 == 0:
+        return f"每{seconds // 3600}小时"
+    if seconds % 60 == 0:
+        return f"每{seconds // 60}分钟"
+    return f"每{seconds}秒"
+
+
+class IdAllocator:
+    """生成便于在聊天中输入的数字任务ID
+
+    从4位数开始，已用ID数量达到当前位数容量的一半时自动增加一位，
+    这样随机抽样的期望尝试次数始终不超过2次，任务再多也能很快分配出ID。
+    """
+
+    def __init__(self, used: Collection[str], min_width: int = 4):
+        # used 通常就是插件维护的 id -> 任务 索引，判断是否占用为 O(1)
+        self.used = used
+        self.min_width = min_width
+
+    def allocate(self) -> str:
+        width = self.min_width
+        while len(self.used) * 2 >= 10 ** width:
+            width += 1
+
+        while True:
+            task_id = str(random.randrange(10 ** width)).zfill(width)
+            if task_id not in self.used:
+                return task_id
+
+
+class Task:
+    """定时任务
+
+    为了支持大量任务，使用 __slots__ 减少内存占用：
+    - msg_origin、平台名、多目标列表使用 sys.intern，相同的字符串只保存一份
+    - 创建时间和一次性任务的触发时间保存为时间戳
+    - 触发描述等人类可读的字符串在需要时才计算，不保存
+    只在持久化时才与 JSON 字典互相转换。
+    """
+
+    __slots__ = ("id", "msg_origin", "platform", "content", "use_gpt", "group_name", "targets",
+                 "cron", "run_at", "interval", "created_at", "last_run", "catchup", "timeout", "overlap", "creator")
+
+    def __init__(
+        self,
+        id: str,
+        msg_origin: str,
+        content: str,
+        use_gpt: bool = False,
+        group_name: Optional[str] = None,
+        targets: Optional[Iterable[str]] = None,
+        cron: Optional[str] = None,
+        run_at: Optional[int] = None,
+        interval: Optional[int] = None,
+        created_at: Optional[int] = None,
+        last_run: Optional[int] = None,
+        catchup: Optional[str] = None,
+        timeout: Optional[int] = None,
+        overlap: Optional[str] = None,
+        creator: Optional[str] = None,
+    ):
+        self.id = id
+        self.msg_origin = sys.intern(msg_origin)
+        self.platform = sys.intern(msg_origin.split(":", 1)[0])
+        self.content = content
+        self.use_gpt = use_gpt
+        self.group_name = sys.intern(group_name) if group_name else None
+        # 多目标任务的所有发送目标（包含 msg_origin），单目标任务为 None
+        self.targets = tuple(sys.intern(t) for t in targets) if targets else None
+        # 触发方式三选一：循环任务的 cron 表达式、一次性任务的触发时间（时间戳）、间隔任务的间隔秒数
+        self.cron = sys.intern(cron) if cron else None
+        self.run_at = run_at
+        # 间隔任务从创建时间起每隔 interval 秒触发一次
+        self.interval = interval
+        self.created_at = created_at if created_at is not None else int(time.time())
+        # 循环任务上次执行的计划触发时间（时间戳），用于重启后补发错过的触发；
+        # 旧版本保存的任务没有这个字段，为 None 时不补发
+        self.last_run = last_run
+        # 错过触发时的补发策略：skip / once / all，None 表示使用全局配置
+        self.catchup = catchup
+        # 每次运行的超时秒数和上一次运行未结束时的重叠策略：skip / queue / replace，None 表示使用全局配置
+        self.timeout = timeout
+        self.overlap = overlap
+        # 创建任务的会话，与发送目标不同时（如私聊创建群任务）才保存
+        self.creator = sys.intern(creator) if creator and creator != msg_origin else None
+
+    @classmethod
+    def from_dict(cls, msg_origin: str, data: dict) -> "Task":
+        run_at = data.get("datetime")
+        created_at = data.get("created_at")
+        last_run = data.get("last_run")
+        return cls(
+            id=data["id"],
+            msg_origin=msg_origin,
+            content=data["content"],
+            use_gpt=data.get("use_gpt", False),
+            group_name=data.get("group_name"),
+            targets=data.get("targets"),
+            cron=data.get("cron"),
+            interval=data.get("interval"),
+            # fromisoformat 也能解析 "2025-03-30 16:30" 这种格式，比 strptime 快得多
+            run_at=int(datetime.fromisoformat(run_at).timestamp()) if run_at else None,
+            created_at=int(datetime.fromisoformat(created_at).timestamp()) if created_at else None,
+            last_run=int(datetime.fromisoformat(last_run).timestamp()) if last_run else None,
+            catchup=data.get("catchup"),
+            timeout=data.get("timeout"),
+            overlap=data.get("overlap"),
+            creator=data.get("creator"),
+        )
+
+    def to_dict(self) -> dict:
+        """转换为保存到 tasks.json 的格式，msg_origin 作为外层的键，不在其中"""
+        data = {
+            "id": self.id,
+            "content": self.content,
+            "use_gpt": self.use_gpt,
+            "group_name": self.group_name,
+            "created_at": format_timestamp(self.created_at),
+        }
+        if self.cron is not None:
+            data["cron"] = self.cron
+        elif self.interval is not None:
+            data["interval"] = self.interval
+        else:
+            data["datetime"] = self.datetime_str
+        if self.targets:
+            data["targets"] = list(self.targets)
+        if self.last_run is not None:
+            data["last_run"] = format_timestamp(self.last_run)
+        if self.catchup:
+            data["catchup"] = self.catchup
+        if self.timeout is not None:
+            data["timeout"] = self.timeout
+        if self.overlap:
+            data["overlap"] = self.overlap
+        if self.creator:
+            data["creator"] = self.creator
+        return data
+
+    @property
+    def owner(self) -> str:
+        """任务所属的会话，/time ls 默认只列出当前会话的任务"""
+        return self.creator or self.msg_origin
+
+    @property
+    def is_once(self) -> bool:
+        """是否是一次性任务"""
+        return self.run_at is not None
+
+    @property
+    def run_datetime(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.run_at) if self.run_at is not None else None
+
+    @property
+    def datetime_str(self) -> Optional[str]:
+        return self.run_datetime.strftime("%Y-%m-%d %H:%M") if self.run_at is not None else None
+
+    @property
+    def schedule_value(self) -> str:
+        if self.interval is not None:
+            return format_interval(self.interval)
+        return self.cron if self.cron is not None else self.datetime_str
+
+    @property
+    def description(self) -> str:
+        """人类可读的触发描述"""
+        if self.interval is not None:
+            return f"循环<{format_interval(self.interval)}>"
+        return cron_cache.describe(self.cron) if self.cron is not None else self.datetime_str
+
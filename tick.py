@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, tzinfo
+from typing import Awaitable, Callable, Optional
+
+from astrbot.api import logger
+
+
+class _Entry:
+    __slots__ = ("task_id", "interval", "anchor", "due", "removed")
+
+    def __init__(self, task_id: str, interval: int, anchor: int):
+        self.task_id = task_id
+        self.interval = interval
+        # 触发时间为 anchor + k * interval，重启后相位不变
+        self.anchor = anchor
+        # 下次触发的时间戳（整秒）
+        self.due = 0
+        self.removed = False
+
+
+class TickEngine:
+    """间隔任务（每N秒/分钟/小时）的调度引擎
+
+    间隔任务不作为 APScheduler 的 job 存在：所有任务按下次触发的秒数放进桶里，
+    桶的时间戳放在一个堆中，后台协程睡到最早的桶到期再醒来，整桶取出后一次分发，
+    同一秒到期的任务只创建一个 asyncio 任务执行。每次 tick 的开销只和到期的任务数有关，与注册的任务总数无关。
+
+    删除和改期采用惰性删除：桶中过期的元素在取出时跳过。
+    事件循环阻塞导致错过的触发不补发，到期的任务执行一次后从当前时间往后排。
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[list[str], datetime], Awaitable[None]],
+        timezone: Optional[tzinfo] = None,
+    ):
+        # 一批到期任务的处理函数，参数为 (任务ID列表, 计划触发时间)
+        self.dispatch = dispatch
+        self.timezone = timezone
+        self._entries: dict[str, _Entry] = {}
+        # {时间戳: [entry, ...]}，以及这些时间戳组成的堆
+        self._buckets: dict[int, list[_Entry]] = {}
+        self._ticks: list[int] = []
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._batches: set[asyncio.Task] = set()
+        self.ticks = 0
+        self.dispatched = 0
+
+    def add(self, task_id: str, interval: int, anchor: int):
+        """添加任务，已存在同ID的任务时替换"""
+        self.add_many([(task_id, interval, anchor)])
+
+    def add_many(self, items: list[tuple[str, int, int]]):
+        """批量添加 [(任务ID, 间隔秒数, 起始时间戳)]，只唤醒一次后台协程"""
+        if not items:
+            return
+        head = self._ticks[0] if self._ticks else None
+        now = time.time()
+        for task_id, interval, anchor in items:
+            self.remove(task_id)
+            entry = _Entry(task_id, interval, anchor)
+            self._entries[task_id] = entry
+            self._plan(entry, now)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        elif head is None or self._ticks[0] < head:
+            self._wakeup.set()
+
+    def remove(self, task_id: str) -> bool:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return False
+        entry.removed = True
+        return True
+
+    def next_fire_time(self, task_id: str) -> Optional[datetime]:
+        entry = self._entries.get(task_id)
+        return datetime.fromtimestamp(entry.due, self.timezone) if entry else None
+
+    def upcoming(self, limit: int) -> list[tuple[datetime, str]]:
+        """最近要触发的 limit 个任务 [(下次触发时间, 任务ID)]
+
+        按时间顺序遍历桶的堆而不弹出（辅助堆中保存待访问的下标），凑够 limit 个即停止，
+        开销只和访问到的桶有关，与注册的任务总数无关。
+        """
+        result = []
+        frontier = [(self._ticks[0], 0)] if self._ticks and limit > 0 else []
+        while frontier:
+            due, i = heapq.heappop(frontier)
+            fire_time = datetime.fromtimestamp(due, self.timezone)
+            # 跳过已删除、已改期的过期元素
+            for task_id in sorted(entry.task_id for entry in self._buckets[due] if not entry.removed and entry.due == due):
+                result.append((fire_time, task_id))
+                if len(result) >= limit:
+                    return result
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._ticks):
+                    heapq.heappush(frontier, (self._ticks[child], child))
+        return result
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _plan(self, entry: _Entry, now: float):
+        """安排 now 之后的下一次触发"""
+        elapsed = now - entry.anchor
+        steps = int(elapsed // entry.interval) + 1 if elapsed >= 0 else 0
+        entry.due = entry.anchor + steps * entry.interval
+        bucket = self._buckets.get(entry.due)
+        if bucket is None:
+            self._buckets[entry.due] = [entry]
+            heapq.heappush(self._ticks, entry.due)
+        else:
+            bucket.append(entry)
+
+    async def _run(self):
+        """睡到最早的桶到期，取出所有到期的桶分发"""
+        while True:
+            self._wakeup.clear()
+            if not self._ticks:
+                await self._wakeup.wait()
+                continue
+            delay = self._ticks[0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._tick(time.time())
+
+    def _tick(self, now: float):
+        while self._ticks and self._ticks[0] <= now:
+            due = heapq.heappop(self._ticks)
+            bucket = self._buckets.pop(due)
+            # 已删除、已改期的是过期的桶元素
+            entries = [entry for entry in bucket if not entry.removed and entry.due == due]
+            if not entries:
+                continue
+            # 先安排下一次触发，再执行，执行出错也不影响之后的调度
+            for entry in entries:
+                self._plan(entry, now)
+            self.ticks += 1
+            self.dispatched += len(entries)
+            batch = asyncio.create_task(
+                self.dispatch([entry.task_id for entry in entries], datetime.fromtimestamp(due, self.timezone))
+            )
+            self._batches.add(batch)
+            batch.add_done_callback(self._batch_done)
+
+    def _batch_done(self, batch: asyncio.Task):
+        self._batches.discard(batch)
+        if not batch.cancelled() and batch.exception() is not None:
+            logger.error(f"间隔任务分发出错: {batch.exception()}")
+
+    async def close(self):
+        """停止调度，中断正在执行的批次"""
+        for task in (self._worker, *self._batches):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
@@ -0,0 +1,111 @@
+import re
+from collections import OrderedDict
+from typing import Optional
+
+from apscheduler.triggers.cron import CronTrigger
+
+
+# 替换英文星期、月份为中文
+# 特别注意，APScheduler 的 cron 格式是差一天的，所以需要特殊处理
+_NAME_MAP = {
+    "Sunday": "周一",
+    "Monday": "周二",
+    "Tuesday": "周三",
+    "Wednesday": "周四",
+    "Thursday": "周五",
+    "Friday": "周六",
+    "Saturday": "周日",
+    "January": "一月",
+    "February": "二月",
+    "March": "三月",
+    "April": "四月",
+    "May": "五月",
+    "June": "六月",
+    "July": "七月",
+    "August": "八月",
+    "September": "九月",
+    "October": "十月",
+    "November": "十一月",
+    "December": "十二月",
+}
+_NAME_PATTERN = re.compile("|".join(_NAME_MAP))
+
+_descriptor_options = None
+
+
+def humanize_cron(cron_str: str) -> str:
+    """
+    使用 cron_descriptor 将 cron 表达式转换为人类可读的格式，如果转换失败则返回原始 cron 表达式
+    """
+    global _descriptor_options
+    try:
+        from cron_descriptor import ExpressionDescriptor, Options, CasingTypeEnum
+        if _descriptor_options is None:
+            # 选项对象只创建一次
+            options = Options()
+            options.locale_code = 'zh_CN'  # 设置语言为中文
+            options.use_24hour_time_format = True  # 使用24小时制
+            options.casing_type = CasingTypeEnum.Sentence  # 使用句子格式
+            _descriptor_options = options
+
+        # 创建描述器并获取描述
+        desc = ExpressionDescriptor(cron_str, _descriptor_options).get_description()
+        # 一次扫描完成所有星期、月份的替换
+        desc = _NAME_PATTERN.sub(lambda m: _NAME_MAP[m.group(0)], desc)
+        return f"循环<{desc}>"
+    except Exception:
+        return f"cron[{cron_str}]"
+
+
+class _CompiledCron:
+    __slots__ = ("trigger", "description")
+
+    def __init__(self, trigger: CronTrigger):
+        self.trigger = trigger
+        # 中文描述在第一次需要时才生成
+        self.description: Optional[str] = None
+
+
+class CronCache:
+    """按表达式缓存解析好的 CronTrigger 及其中文描述，超过容量时淘汰最久未使用的
+
+    CronTrigger 本身是无状态的，相同表达式的任务可以共用同一个对象，
+    成千上万个 "0 9 * * *" 任务只需要解析一次、占用一份内存。
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, _CompiledCron] = OrderedDict()
+
+    def _get(self, expr: str) -> _CompiledCron:
+        entry = self._entries.get(expr)
+        if entry is not None:
+            self._entries.move_to_end(expr)
+            return entry
+        # 表达式无效时抛出 ValueError，不会被缓存
+        entry = _CompiledCron(CronTrigger.from_crontab(expr))
+        self._entries[expr] = entry
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def trigger(self, expr: str) -> CronTrigger:
+        """返回表达式对应的触发器，表达式无效时抛出 ValueError"""
+        return self._get(expr).trigger
+
+    def describe(self, expr: str) -> str:
+        """返回表达式的中文描述，表达式无效时返回原始表达式"""
+        try:
+            entry = self._get(expr)
+        except ValueError:
+            return f"cron[{expr}]"
+        if entry.description is None:
+            entry.description = humanize_cron(expr)
+        return entry.description
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# 进程内共享的缓存
+cron_cache = CronCache()